@@ -0,0 +1,363 @@
+"""
+Audio analysis store for Music To Visualized Video converter.
+Decodes each track once and keeps a compact analysis of it (downsampled waveform
+and envelope, per-frame peaks and RMS, optional log-magnitude spectrogram) as .npy
+files that are memory-mapped at render time, so re-renders never decode again.
+Tracks are decoded and analysed in fixed blocks, so memory stays flat on long tracks.
+"""
+
+import os
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from atomic_file import atomic_path, partial_path
+from ffmpeg_progress import read_tail
+
+
+# Bump when the stored arrays change meaning or layout
+ANALYSIS_FORMAT_VERSION = 1
+
+# Rate tracks are decoded at for analysis, independent of the output audio rate
+ANALYSIS_RATE = 44100
+
+# The stored waveform keeps every WAVEFORM_DECIMATION-th sample (block averaged)
+WAVEFORM_DECIMATION = 4
+WAVEFORM_RATE = ANALYSIS_RATE // WAVEFORM_DECIMATION
+
+# Peak envelope blocks per second
+ENVELOPE_RATE = 200
+
+# Samples per envelope block
+ENVELOPE_BLOCK = ANALYSIS_RATE // ENVELOPE_RATE
+
+# FFT size of the spectrogram, one Hann window centred on every frame
+SPECTRUM_SIZE = 2048
+
+# Samples decoded and analysed at a time (about 10 s), a multiple of the waveform and envelope blocks
+DECODE_BLOCK = 440000
+
+
+def decode_blocks(audio_path, block=DECODE_BLOCK, rate=ANALYSIS_RATE):
+    """Decode a track into consecutive float32 (samples, 2) arrays of at most block samples.
+
+    ffmpeg's output is read one block at a time, so memory does not grow with the track.
+    """
+    cmd = ['ffmpeg', '-v', 'error', '-i', str(audio_path), '-f', 'f32le', '-ac', '2', '-ar', str(rate), '-']
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stderr = []
+    reader = threading.Thread(target=lambda: stderr.append(read_tail(process.stderr)), daemon=True)
+    reader.start()
+    finished = False
+    try:
+        while True:
+            # A full block unless ffmpeg has reached the end of the track
+            data = process.stdout.read(block * 8)
+            if len(data) < 8:
+                finished = True
+                break
+            yield np.frombuffer(data[:len(data) - len(data) % 8], dtype='<f4').reshape(-1, 2)
+    finally:
+        if not finished:
+            # The caller stopped early
+            process.kill()
+        process.wait()
+        process.stdout.close()
+        reader.join()
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, cmd, stderr=''.join(stderr))
+
+
+def _frame_edge(frame, frate):
+    """First sample of a video frame at frate."""
+    return int(np.round(frame * (ANALYSIS_RATE / frate)))
+
+
+def _frame_edges(first, last, frate):
+    """First samples of video frames first .. last - 1 at frate."""
+    return np.round(np.arange(first, last) * (ANALYSIS_RATE / frate)).astype(np.int64)
+
+
+def _frames_until(sample, frate):
+    """Number of video frames whose first sample is at most sample."""
+    frame = int(sample * frate / ANALYSIS_RATE) + 1
+    while frame > 0 and _frame_edge(frame, frate) > sample:
+        frame -= 1
+    return frame + 1
+
+
+def _block_reduce(pcm, block, reduce):
+    """Apply reduce over consecutive blocks of samples; a short last block is padded with zeros."""
+    blocks = -(-len(pcm) // block)
+    padded = np.zeros((blocks * block, 2), np.float32)
+    padded[:len(pcm)] = pcm
+    return reduce(padded.reshape(blocks, block, 2), axis=1)
+
+
+def _frame_peaks_rms(pcm, starts, ends):
+    """Peak and RMS of each channel over pcm[start:end] of consecutive frames, (frames, 2) float32.
+
+    Empty frames, which only occur at the end of a track, are zero.
+    """
+    peaks = np.zeros((len(starts), 2), np.float32)
+    rms = np.zeros((len(starts), 2), np.float32)
+    nonempty = ends > starts
+    if nonempty.any():
+        offsets = starts[nonempty]
+        samples = pcm[:ends[nonempty][-1]]
+        lengths = (ends - starts)[nonempty][:, None]
+        squares = np.add.reduceat(np.square(samples, dtype=np.float64), offsets, axis=0)
+        rms[nonempty] = np.sqrt(squares / lengths)
+        peaks[nonempty] = np.maximum.reduceat(np.abs(samples), offsets, axis=0)
+    return peaks, rms
+
+
+def _spectrum(windows):
+    """Log-magnitude (dB) spectrum of rows of SPECTRUM_SIZE mono samples, float16."""
+    magnitude = np.abs(np.fft.rfft(windows * np.hanning(SPECTRUM_SIZE).astype(np.float32), axis=1))
+    return (20 * np.log10(magnitude / (SPECTRUM_SIZE / 4) + 1e-6)).astype(np.float16)
+
+
+class _ArrayWriter:
+    """Writes a .npy file a few rows at a time.
+
+    Rows are appended to a raw side file; finish() writes the .npy header, now that
+    the row count is known, followed by the rows, and moves the result into place.
+    """
+
+    def __init__(self, path, dtype, row_shape):
+        self.path = Path(path)
+        self.dtype = np.dtype(dtype)
+        self.row_shape = tuple(row_shape)
+        self.rows = 0
+        self._raw_path = partial_path(self.path, "raw")
+        self._raw = open(self._raw_path, 'wb')
+
+    def append(self, rows):
+        self._raw.write(np.ascontiguousarray(rows, dtype=self.dtype).tobytes())
+        self.rows += len(rows)
+
+    def finish(self):
+        self._raw.close()
+        header = {'descr': np.lib.format.dtype_to_descr(self.dtype), 'fortran_order': False,
+                  'shape': (self.rows,) + self.row_shape}
+        with atomic_path(self.path) as partial, open(partial, 'wb') as f, open(self._raw_path, 'rb') as raw:
+            np.lib.format.write_array_header_1_0(f, header)
+            shutil.copyfileobj(raw, f, 1 << 20)
+        os.remove(self._raw_path)
+
+    def discard(self):
+        self._raw.close()
+        try:
+            os.remove(self._raw_path)
+        except OSError:
+            pass
+
+
+class _TrackAnalyser:
+    """Computes the analysis of a track from consecutive blocks of its samples.
+
+    Every output is written out as soon as its inputs are complete: the waveform and
+    envelope block by block, per-frame values once a frame's samples (or, for the
+    spectrum, the window centred on its start) have arrived. Only the samples of the
+    frames still open are carried from one block to the next.
+    """
+
+    def __init__(self, frate, writers):
+        """
+        Args:
+            frate: Video frame rate of the per-frame outputs, or None when there are none
+            writers: _ArrayWriter per output ('waveform', 'envelope', 'peaks', 'rms',
+                'spectrum'); outputs without a writer are not computed
+        """
+        self.frate = frate
+        self.writers = writers
+        self.samples = 0
+        # Stereo samples from the first sample of frame _frame on
+        self._frame = 0
+        self._frame_pcm = np.zeros((0, 2), np.float32)
+        # Mono samples from sample _mono_start on, covering the window of frame _spectrum_frame
+        self._spectrum_frame = 0
+        self._mono_start = -(SPECTRUM_SIZE // 2)
+        self._mono = np.zeros(SPECTRUM_SIZE // 2, np.float32)
+
+    def feed(self, pcm):
+        """Analyse the next block of samples."""
+        self.samples += len(pcm)
+        if 'waveform' in self.writers:
+            self.writers['waveform'].append(_block_reduce(pcm, WAVEFORM_DECIMATION, np.mean))
+        if 'envelope' in self.writers:
+            self.writers['envelope'].append(_block_reduce(np.abs(pcm), ENVELOPE_BLOCK, np.max))
+        if 'peaks' in self.writers:
+            self._frame_pcm = np.concatenate((self._frame_pcm, pcm))
+            # A frame is complete once the next one has started
+            self._write_frames(_frames_until(self.samples, self.frate) - 1)
+        if 'spectrum' in self.writers:
+            self._mono = np.concatenate((self._mono, pcm.mean(axis=1)))
+            self._write_spectrum(_frames_until(self.samples - SPECTRUM_SIZE // 2, self.frate)
+                                 if self.samples >= SPECTRUM_SIZE // 2 else 0)
+
+    def finish(self):
+        """Analyse the frames left open at the end of the track and write every output."""
+        if 'peaks' in self.writers:
+            self._write_frames(self._frame_count())
+        if 'spectrum' in self.writers:
+            self._mono = np.concatenate((self._mono, np.zeros(SPECTRUM_SIZE, np.float32)))
+            self._write_spectrum(self._frame_count())
+        for writer in self.writers.values():
+            writer.finish()
+
+    def discard(self):
+        for writer in self.writers.values():
+            writer.discard()
+
+    def _frame_count(self):
+        return max(1, int(np.ceil(self.samples * self.frate / ANALYSIS_RATE)))
+
+    def _write_frames(self, end):
+        if end <= self._frame:
+            return
+        edges = np.minimum(_frame_edges(self._frame, end + 1, self.frate), self.samples)
+        edges -= edges[0]
+        peaks, rms = _frame_peaks_rms(self._frame_pcm, edges[:-1], edges[1:])
+        self.writers['peaks'].append(peaks)
+        self.writers['rms'].append(rms)
+        self._frame_pcm = self._frame_pcm[edges[-1]:]
+        self._frame = end
+
+    def _write_spectrum(self, end):
+        if end <= self._spectrum_frame:
+            return
+        # Window i of _mono starts at sample _mono_start + i; frame windows start half a window early
+        starts = np.minimum(_frame_edges(self._spectrum_frame, end, self.frate), self.samples)
+        windows = np.lib.stride_tricks.sliding_window_view(self._mono, SPECTRUM_SIZE)
+        self.writers['spectrum'].append(_spectrum(windows[starts - SPECTRUM_SIZE // 2 - self._mono_start]))
+        # Keep the samples from the window of the next frame on
+        drop = min(_frame_edge(end, self.frate) - SPECTRUM_SIZE // 2 - self._mono_start, len(self._mono))
+        if drop > 0:
+            self._mono = self._mono[drop:]
+            self._mono_start += drop
+        self._spectrum_frame = end
+
+
+def column_peaks(envelope, columns, seconds=None):
+    """Reduce a peak envelope to `columns` (left, right) peaks in 0..1, covering its first seconds.
+
+    Used to draw a whole track as a fixed-width waveform strip.
+    """
+    blocks = len(envelope) if seconds is None else min(len(envelope), max(1, int(seconds * ENVELOPE_RATE)))
+    if blocks == 0:
+        return np.zeros((columns, 2), np.float32)
+    values = np.asarray(envelope[:blocks], np.float32)
+    edges = np.minimum((np.arange(columns) * blocks) // columns, blocks - 1)
+    peaks = np.maximum.reduceat(values, edges, axis=0)
+    return np.clip(peaks / max(float(values.max()), 1e-6), 0, 1)
+
+
+class TrackAnalysis:
+    """Memory-mapped analysis of one track at one frame rate.
+
+    Attributes:
+        frate: Video frame rate the per-frame arrays are computed for
+        waveform: (samples, 2) float16 at WAVEFORM_RATE
+        envelope: (blocks, 2) float16 peak envelope at ENVELOPE_RATE
+        peaks, rms: (frames, 2) float32 per video frame
+        spectrum: (frames, SPECTRUM_SIZE // 2 + 1) float16 dB, or None when not requested
+    """
+
+    def __init__(self, frate, waveform, envelope, peaks, rms, spectrum=None):
+        self.frate = frate
+        self.waveform = waveform
+        self.envelope = envelope
+        self.peaks = peaks
+        self.rms = rms
+        self.spectrum = spectrum
+
+    @property
+    def frame_count(self):
+        return len(self.rms)
+
+    @property
+    def duration(self):
+        return len(self.waveform) / WAVEFORM_RATE
+
+
+class AnalysisStore:
+    """Directory of track analyses keyed by audio file hash, and by frame rate for per-frame data."""
+
+    def __init__(self, store_dir, file_digest):
+        """
+        Initialize the store.
+
+        Args:
+            store_dir: Directory holding the .npy files (created on demand)
+            file_digest: Callable returning the content hash of an audio file, e.g.
+                SegmentCache.file_digest so each file is hashed once per run
+        """
+        self.store_dir = Path(store_dir)
+        self.file_digest = file_digest
+        self._lock = threading.Lock()
+        self._track_locks = {}
+
+    def _track_dir(self, digest):
+        return self.store_dir / f"v{ANALYSIS_FORMAT_VERSION}_{digest}"
+
+    def _paths(self, audio_path):
+        """Return the track's digest and directory."""
+        digest = self.file_digest(audio_path)
+        return digest, self._track_dir(digest)
+
+    def _compute_missing(self, audio_path, digest, frate, paths):
+        """Decode audio_path once and write whichever of paths do not exist yet."""
+        with self._lock:
+            track_lock = self._track_locks.setdefault(digest, threading.Lock())
+        with track_lock:
+            missing = {name for name, path in paths.items() if not path.exists()}
+            if not missing:
+                return
+            # Peaks and RMS come out of the same pass
+            if missing & {'peaks', 'rms'}:
+                missing |= {'peaks', 'rms'}
+            paths[next(iter(missing))].parent.mkdir(parents=True, exist_ok=True)
+            layouts = {
+                'waveform': (np.float16, (2,)),
+                'envelope': (np.float16, (2,)),
+                'peaks': (np.float32, (2,)),
+                'rms': (np.float32, (2,)),
+                'spectrum': (np.float16, (SPECTRUM_SIZE // 2 + 1,)),
+            }
+            analyser = _TrackAnalyser(frate, {name: _ArrayWriter(paths[name], *layouts[name])
+                                              for name in missing})
+            try:
+                for pcm in decode_blocks(audio_path):
+                    analyser.feed(pcm)
+                analyser.finish()
+            except BaseException:
+                analyser.discard()
+                raise
+
+    def get(self, audio_path, frate, spectrum=False):
+        """Return the TrackAnalysis of audio_path at frate, decoding the track only if needed."""
+        digest, track_dir = self._paths(audio_path)
+        paths = {
+            'waveform': track_dir / "waveform.npy",
+            'envelope': track_dir / "envelope.npy",
+            'peaks': track_dir / f"peaks_{frate}.npy",
+            'rms': track_dir / f"rms_{frate}.npy",
+        }
+        if spectrum:
+            paths['spectrum'] = track_dir / f"spectrum_{frate}.npy"
+        self._compute_missing(audio_path, digest, frate, paths)
+
+        arrays = {name: np.load(path, mmap_mode='r') for name, path in paths.items()}
+        return TrackAnalysis(frate, **arrays)
+
+    def get_envelope(self, audio_path):
+        """Return the memory-mapped peak envelope of audio_path, computing only the envelope if needed."""
+        digest, track_dir = self._paths(audio_path)
+        paths = {'envelope': track_dir / "envelope.npy"}
+        self._compute_missing(audio_path, digest, None, paths)
+        return np.load(paths['envelope'], mmap_mode='r')
@@ -0,0 +1,34 @@
+"""
+Atomic file writes for Music To Visualized Video converter.
+Caches and stores shared between threads and processes are written to a private
+partial file first and then moved into place, so readers never see a half-written file.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+
+def partial_path(path, suffix="part"):
+    """Return a sibling of path private to this process and thread."""
+    path = Path(path)
+    return path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.{suffix}")
+
+
+@contextmanager
+def atomic_path(path):
+    """Yield a partial path to write instead of path, and move it onto path on success.
+
+    If the block raises, the partial file is removed and path is left untouched.
+    """
+    partial = partial_path(path)
+    try:
+        yield partial
+        os.replace(partial, path)
+    except BaseException:
+        try:
+            os.remove(partial)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-track audio analysis, computed once and then memory-mapped.
+
+Generates a track, then times decoding it to PCM block by block (what every
+render paid before), the first analysis (decode, compute and save, with and without the
+spectrogram), and a warm lookup that only memory-maps the stored arrays.
+Also reports the size of the stored analysis.
+
+    python benchmarks/bench_analysis_store.py --minutes 4
+"""
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from analysis_store import AnalysisStore, decode_blocks  # noqa: E402
+from segment_cache import SegmentCache  # noqa: E402
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--minutes', type=float, default=4, help='Track length in minutes (default: 4)')
+    parser.add_argument('--frate', type=int, default=30, help='Frame rate (default: 30)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        audio_path = Path(work_dir) / "track.mp3"
+        subprocess.run(['ffmpeg', '-v', 'error', '-f', 'lavfi', '-i',
+                        f'anoisesrc=duration={args.minutes * 60}:color=pink,tremolo=f=2:d=0.8',
+                        '-ac', '2', '-b:a', '192k', str(audio_path), '-y'], check=True)
+        digests = SegmentCache(Path(work_dir) / "segments", 0)
+
+        decode_time, _ = timed(lambda: sum(len(block) for block in decode_blocks(audio_path)))
+        print(f"decode to PCM               {1000 * decode_time:8.1f} ms")
+
+        for spectrum in (False, True):
+            store = AnalysisStore(Path(work_dir) / f"analysis_{spectrum}", digests.file_digest)
+            cold, _ = timed(lambda: store.get(audio_path, args.frate, spectrum))
+            warm, analysis = timed(lambda: store.get(audio_path, args.frate, spectrum))
+            size = sum(path.stat().st_size for path in store.store_dir.rglob("*.npy"))
+            label = "with spectrogram" if spectrum else "without spectrogram"
+            print(f"first analysis {label:<20} {1000 * cold:8.1f} ms, stored {size / (1024 * 1024):.1f} MB")
+            print(f"warm lookup {label:<23} {1000 * warm:8.1f} ms "
+                  f"({analysis.frame_count} frames of peaks/rms)")
+
+
+if __name__ == "__main__":
+    main()
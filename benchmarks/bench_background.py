@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: per-track background image preparation.
+
+Times album art decoding plus create_background_image for a batch of tracks
+that share album art, once with the layer cache reset before every track (the
+previous uncached behaviour) and once with the cache kept warm across the batch.
+
+    python benchmarks/bench_background.py --tracks 25 --font arial.ttf
+"""
+
+import argparse
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from compositor import BackgroundCompositor  # noqa: E402
+from core import MP3ToVideoConverter  # noqa: E402
+
+
+def make_fixture(work_dir, tracks):
+    buffer = io.BytesIO()
+    Image.effect_mandelbrot((3000, 3000), (-2.0, -1.5, 1.0, 1.5), 100).convert('RGB').save(buffer, 'JPEG', quality=95)
+    art_data = buffer.getvalue()
+    track_list = [f"{i + 1}. Track number {i + 1} - Some Artist" for i in range(tracks)]
+    metadata = {'title': 'Benchmark Title', 'artist': 'Some Artist', 'album': 'Some Album',
+                'genre': 'Genre', 'year': '2024'}
+    return art_data, track_list, metadata
+
+
+def time_batch(converter, work_dir, art_data, track_list, metadata, tracks, cold):
+    timings = []
+    for i in range(tracks):
+        if cold:
+            converter.compositor = BackgroundCompositor(background=converter.background)
+            converter._text_fill_cache = {}
+        start = time.perf_counter()
+        album_art = converter.load_album_art(art_data)
+        converter.create_background_image(metadata, Path(work_dir) / f"bg_{i}.jpg", album_art, track_list, i)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tracks', type=int, default=25, help='Tracks in the batch (default: 25)')
+    parser.add_argument('--font', default='arial.ttf', help='Font file (default: arial.ttf)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        art_data, track_list, metadata = make_fixture(work_dir, args.tracks)
+        converter = MP3ToVideoConverter(work_dir, Path(work_dir) / "out", font=args.font,
+                                        log_callback=lambda message: None, use_tqdm=False)
+        for label, cold in (("uncached", True), ("cached", False)):
+            timings = time_batch(converter, work_dir, art_data, track_list, metadata, args.tracks, cold)
+            print(f"{label:<9} total {sum(timings):7.3f}s  per track {1000 * sum(timings) / len(timings):7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
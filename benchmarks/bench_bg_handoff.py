@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark: handing a composed background from PIL to ffmpeg.
+
+For each --bg-format (jpeg q95 temp file, png temp file, raw RGB through stdin)
+measures the PIL-side cost (encode + write), the time ffmpeg spends producing
+--duration seconds of frames from that background, and whether the frame
+ffmpeg sees is byte-identical to the composed image.
+
+    python benchmarks/bench_bg_handoff.py --duration 10 --repeat 3
+"""
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image, ImageChops, ImageDraw
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from compositor import RawFrame  # noqa: E402
+
+
+def make_background():
+    image = Image.effect_mandelbrot((1920, 1080), (-2.0, -1.0, 1.0, 1.0), 80).convert('RGB')
+    draw = ImageDraw.Draw(image)
+    for y in range(100, 1000, 30):
+        draw.text((50, y), "Track list row with outlined text", fill=(255, 255, 0), stroke_width=1,
+                  stroke_fill=(0, 0, 0))
+    return image
+
+
+def hand_off(image, bg_format, work_dir, frate):
+    """Return (seconds spent in PIL, ffmpeg input args, stdin bytes, still)."""
+    start = time.perf_counter()
+    if bg_format == 'raw':
+        frame = RawFrame(image)
+        input_args = ['-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{frame.width}x{frame.height}',
+                      '-framerate', str(frate), '-i', 'pipe:0']
+        return time.perf_counter() - start, input_args, frame.data, True
+    path = Path(work_dir) / f"bg.{'png' if bg_format == 'png' else 'jpg'}"
+    if bg_format == 'png':
+        image.save(path, 'PNG', compress_level=1)
+    else:
+        image.save(path, 'JPEG', quality=95)
+    return time.perf_counter() - start, ['-loop', '1', '-i', str(path)], None, False
+
+
+def run_ffmpeg(input_args, data, still, frate, duration, output_args):
+    graph = f"[0:v]loop=loop=-1:size=1,setpts=N/({frate}*TB)[v]" if still else "[0:v]null[v]"
+    cmd = ['ffmpeg', '-hide_banner', '-loglevel', 'error', *input_args,
+           '-filter_complex', graph, '-map', '[v]', *output_args]
+    start = time.perf_counter()
+    result = subprocess.run(cmd, input=data, capture_output=True, check=True)
+    return time.perf_counter() - start, result.stdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=float, default=10, help='Seconds of video per run (default: 10)')
+    parser.add_argument('--frate', type=int, default=30, help='Frame rate (default: 30)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per format, best is kept (default: 3)')
+    args = parser.parse_args()
+
+    image = make_background()
+    print(f"{'format':<6} {'PIL ms':>8} {'ffmpeg s':>9} {'exact':>6} {'max err':>8}")
+    with tempfile.TemporaryDirectory() as work_dir:
+        for bg_format in ('jpeg', 'png', 'raw'):
+            best_pil = best_ffmpeg = None
+            for _ in range(args.repeat):
+                pil_time, input_args, data, still = hand_off(image, bg_format, work_dir, args.frate)
+                ffmpeg_time, _ = run_ffmpeg(input_args, data, still, args.frate, args.duration,
+                                            ['-t', str(args.duration), '-pix_fmt', 'yuv420p', '-f', 'null', '-'])
+                best_pil = pil_time if best_pil is None else min(best_pil, pil_time)
+                best_ffmpeg = ffmpeg_time if best_ffmpeg is None else min(best_ffmpeg, ffmpeg_time)
+
+            _, frame = run_ffmpeg(input_args, data, still, args.frate, args.duration,
+                                  ['-frames:v', '1', '-pix_fmt', 'rgb24', '-f', 'rawvideo', '-'])
+            seen = Image.frombytes('RGB', image.size, frame)
+            max_err = max(high for _, high in ImageChops.difference(image, seen).getextrema())
+            print(f"{bg_format:<6} {1000 * best_pil:8.1f} {best_ffmpeg:9.2f} {str(max_err == 0):>6} {max_err:8d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: blurred backdrop generation.
+
+Builds the darkened, blurred 1920x1080 backdrop from a few source images with
+the exact (full-resolution) and fast (downsampled) blur, and reports the time of
+each and the error of the fast path against the exact one.
+
+    python benchmarks/bench_blur.py --repeat 5 [--image cover.jpg ...]
+"""
+
+import argparse
+import math
+import sys
+import time
+from pathlib import Path
+
+from PIL import Image, ImageChops, ImageStat
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from compositor import BackgroundCompositor  # noqa: E402
+
+
+def sources(paths):
+    if paths:
+        return {Path(path).name: Image.open(path).convert('RGB') for path in paths}
+    return {
+        'mandelbrot 800x800': Image.effect_mandelbrot((800, 800), (-2.0, -1.5, 1.0, 1.5), 100).convert('RGB'),
+        'noise 800x800': Image.effect_noise((800, 800), 80).convert('RGB'),
+        'gradient 1600x600': Image.linear_gradient('L').resize((1600, 600)).convert('RGB'),
+    }
+
+
+def time_backdrop(source, quality, repeat):
+    best = None
+    image = None
+    for _ in range(repeat):
+        compositor = BackgroundCompositor(blur_quality=quality)
+        start = time.perf_counter()
+        image = compositor._darkened_backdrop(source)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, image
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement, best is kept (default: 5)')
+    parser.add_argument('--image', nargs='*', default=[], help='Source images (default: synthetic set)')
+    args = parser.parse_args()
+
+    print(f"{'source':<20} {'exact ms':>9} {'fast ms':>8} {'max err':>8} {'mean err':>9} {'PSNR dB':>8}")
+    for name, source in sources(args.image).items():
+        exact_time, exact = time_backdrop(source, 'exact', args.repeat)
+        fast_time, fast = time_backdrop(source, 'fast', args.repeat)
+        diff = ImageChops.difference(exact, fast)
+        max_err = max(high for _, high in diff.getextrema())
+        stat = ImageStat.Stat(diff)
+        mean_err = sum(stat.mean) / len(stat.mean)
+        mse = sum(value * value for value in stat.rms) / len(stat.rms)
+        psnr = float('inf') if mse == 0 else 10 * math.log10(255 ** 2 / mse)
+        print(f"{name:<20} {1000 * exact_time:9.1f} {1000 * fast_time:8.1f} {max_err:8d} {mean_err:9.3f} {psnr:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark: frames per second of the NumPy frame engine at 1080p.
+
+Generates a tone and analyses it once, then times the frame engine alone (draw
+and serialise every frame, pinned to one core where the OS allows it) and the
+engine streaming rawvideo into ffmpeg through the converter's bounded pipe,
+with ffmpeg writing to the null muxer or encoding with --codec.
+
+    python benchmarks/bench_frame_engine.py --duration 30 --vis-type 6
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from compositor import RawFrame  # noqa: E402
+from core import MP3ToVideoConverter  # noqa: E402
+from viz_filters import VisualizationFilters  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=float, default=30, help='Seconds of video (default: 30)')
+    parser.add_argument('--frate', type=int, default=30, help='Frame rate (default: 30)')
+    parser.add_argument('--vis-type', type=int, default=6, help='Frame engine vis type (default: 6)')
+    parser.add_argument('--codec', help='Encode with this codec instead of writing to the null muxer')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        audio_path = Path(work_dir) / "tone.mp3"
+        subprocess.run(['ffmpeg', '-v', 'error', '-f', 'lavfi', '-i',
+                        f'sine=frequency=220:duration={args.duration},volume=8', '-af', 'tremolo=f=2:d=0.8',
+                        '-ac', '2', str(audio_path), '-y'], check=True)
+        background = RawFrame(Image.effect_mandelbrot((1920, 1080), (-2.0, -1.0, 1.0, 1.0), 80).convert('RGB'))
+        viz = VisualizationFilters(vis_type=args.vis_type, frate=args.frate)
+        frames = args.duration * args.frate
+        converter = MP3ToVideoConverter(work_dir, Path(work_dir) / "out", frate=args.frate, vis_type=args.vis_type,
+                                        log_callback=lambda message: None, use_tqdm=False)
+        start = time.perf_counter()
+        analysis = converter.analysis_store.get(audio_path, args.frate, viz.frame_engine().needs_spectrum)
+        print(f"track analysis        {1000 * (time.perf_counter() - start):7.1f} ms (once per track)")
+
+        if hasattr(os, 'sched_setaffinity'):
+            affinity = os.sched_getaffinity(0)
+            os.sched_setaffinity(0, {min(affinity)})
+        start = time.perf_counter()
+        count = sum(1 for _ in viz.frame_engine().frames(background, analysis, args.duration))
+        elapsed = time.perf_counter() - start
+        print(f"engine only (1 core)  {count / elapsed:7.1f} fps  ({count / elapsed / args.frate:.1f}x real time)")
+        if hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(0, affinity)
+
+        bg_input, frames_source = converter._background_input(background, viz, audio_path, args.duration)
+        if args.codec:
+            output_args = ['-c:v', args.codec, '-pix_fmt', 'yuv420p', str(Path(work_dir) / "out.mp4"), '-y']
+        else:
+            output_args = ['-pix_fmt', 'yuv420p', '-f', 'null', '-']
+        cmd = ['ffmpeg', '-v', 'error', *bg_input, '-t', str(args.duration), *output_args]
+        start = time.perf_counter()
+        converter.run_ffmpeg_command(cmd, frames_source)
+        elapsed = time.perf_counter() - start
+        label = f"piped to {args.codec or 'null'}"
+        print(f"{label:<21} {frames / elapsed:7.1f} fps  ({frames / elapsed / args.frate:.1f}x real time)")
+
+
+if __name__ == "__main__":
+    main()
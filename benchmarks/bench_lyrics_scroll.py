@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark: scrolling lyrics overlay.
+
+Renders the lyrics part of a track graph (static background plus scrolling
+lyrics, no visualization, null output) for lyrics images of growing height, with
+the previous graph (looped PNG input scaled and overlaid whole every frame) and
+the windowed graph (PNG decoded once, padded, looped and cropped to the visible
+600x1080 window). Reports frames per second and ffmpeg's peak memory.
+
+    python benchmarks/bench_lyrics_scroll.py --duration 20 --heights 2000 8000 20000
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+
+def make_lyrics(path, height):
+    image = Image.new('RGBA', (600, height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    for y in range(25, height - 30, 30):
+        draw.text((0, y), f"line {y // 30}: some lyrics words for the benchmark", fill=(200, 200, 255, 255))
+    image.save(path, 'PNG')
+
+
+def graphs(height, duration, frate):
+    speed = (height + 1080) / duration
+    previous = (
+        ['-loop', '1'],
+        f"[1:v]scale=600:-1:flags=fast_bilinear,format=rgba[lyrics];"
+        f"[0:v][lyrics]overlay=x=1270:y='if(gte(t,0), (H)-{speed}*t, 0)':shortest=1,fps={frate}[outv]"
+    )
+    windowed = (
+        [],
+        f"[1:v]format=rgba,pad=iw:ih+2160:0:1080:color=black@0,"
+        f"loop=loop=-1:size=1,setpts=N/({frate}*TB),"
+        f"crop=iw:1080:0:'1080-2*floor(trunc(1080-{speed}*t)/2)'[lyrics];"
+        f"[0:v][lyrics]overlay=x=1270:y=0:shortest=1,fps={frate}[outv]"
+    )
+    return {'previous': previous, 'windowed': windowed}
+
+
+def run(background, lyrics, lyrics_input_args, filter_complex, duration, frate):
+    cmd = [
+        'ffmpeg', '-hide_banner', '-benchmark',
+        '-loop', '1', '-i', str(background),
+        *lyrics_input_args, '-i', str(lyrics),
+        '-filter_complex', filter_complex,
+        '-map', '[outv]', '-t', str(duration), '-r', str(frate),
+        '-f', 'null', '-'
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, errors='ignore', check=True)
+    rtime = float(re.search(r"rtime=([\d.]+)s", result.stderr).group(1))
+    maxrss = int(re.search(r"maxrss=(\d+)KiB", result.stderr).group(1))
+    return rtime, maxrss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=float, default=20, help='Seconds rendered per run (default: 20)')
+    parser.add_argument('--frate', type=int, default=30, help='Frame rate (default: 30)')
+    parser.add_argument('--heights', type=int, nargs='+', default=[2000, 8000, 20000],
+                        help='Lyrics image heights in pixels (default: 2000 8000 20000)')
+    args = parser.parse_args()
+
+    frames = args.duration * args.frate
+    with tempfile.TemporaryDirectory() as work_dir:
+        background = Path(work_dir) / "bg.jpg"
+        Image.new('RGB', (1920, 1080), (40, 60, 80)).save(background, quality=95)
+        print(f"{'height':>7}  {'graph':<9} {'fps':>8} {'ms/frame':>9} {'maxrss MB':>10}")
+        for height in args.heights:
+            lyrics = Path(work_dir) / f"lyrics_{height}.png"
+            make_lyrics(lyrics, height)
+            for label, (input_args, filter_complex) in graphs(height, args.duration, args.frate).items():
+                rtime, maxrss = run(background, lyrics, input_args, filter_complex, args.duration, args.frate)
+                print(f"{height:>7}  {label:<9} {frames / rtime:8.1f} {1000 * rtime / frames:9.2f} "
+                      f"{maxrss / 1024:10.1f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
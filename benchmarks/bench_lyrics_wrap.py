@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: lyrics word wrapping.
+
+Wraps a corpus of long synthetic lyrics with the previous algorithm (measure the
+whole candidate line for every word) and with WordWrapper (cached word widths,
+exact check only near the limit), checks that both produce identical lines and
+reports the time and the number of font measurements.
+
+    python benchmarks/bench_lyrics_wrap.py --songs 50 --font arial.ttf
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+from PIL import ImageFont
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fonts import WordWrapper  # noqa: E402
+
+
+class CountingFont:
+    """Wraps a font and counts the measurements made through it."""
+
+    def __init__(self, font):
+        self.font = font
+        self.size = font.size
+        self.calls = 0
+
+    def getbbox(self, text):
+        self.calls += 1
+        return self.font.getbbox(text)
+
+    def getlength(self, text):
+        self.calls += 1
+        return self.font.getlength(text)
+
+
+def wrap_quadratic(font, paragraphs, width):
+    """The previous wrapping loop from create_lyrics_image."""
+    lines = []
+    for paragraph in paragraphs:
+        current_line = []
+        for word in paragraph.split():
+            bbox = font.getbbox(' '.join(current_line + [word]))
+            if bbox[2] - bbox[0] <= width:
+                current_line.append(word)
+            else:
+                if current_line:
+                    lines.append(' '.join(current_line))
+                current_line = [word]
+        if current_line:
+            lines.append(' '.join(current_line))
+        lines.append('')
+    return lines
+
+
+def wrap_linear(wrapper, paragraphs, width):
+    lines = []
+    for paragraph in paragraphs:
+        lines.extend(wrapper.wrap(paragraph.split(), width))
+        lines.append('')
+    return lines
+
+
+def make_corpus(songs, seed=1):
+    rng = random.Random(seed)
+    vocabulary = ["love", "night", "we", "I", "you", "forever", "AVAVAV", "Wow", "To", "yesterday's",
+                  "fly", "away", "tomorrow", "lights", "Tokyo", "crème", "brûlée", "naïve", "WAVY",
+                  "unbelievable", "la", "oh", "a", "heart", "rhythm", "Typography", "kerning", "fi", "ff"]
+    corpus = []
+    for _ in range(songs):
+        paragraphs = []
+        for _ in range(rng.randint(20, 60)):
+            # Mostly verse lines, some very long unbroken paragraphs
+            count = rng.randint(4, 12) if rng.random() < 0.8 else rng.randint(60, 200)
+            paragraphs.append(' '.join(rng.choice(vocabulary) for _ in range(count)))
+        corpus.append(paragraphs)
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--songs', type=int, default=50, help='Songs in the corpus (default: 50)')
+    parser.add_argument('--font', default='arial.ttf', help='Font file (default: arial.ttf)')
+    parser.add_argument('--width', type=int, default=600, help='Wrap width in pixels (default: 600)')
+    parser.add_argument('--font-size', type=int, default=25, help='Font size (default: 25)')
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.songs)
+    results = {}
+    for label in ("quadratic", "linear"):
+        font = CountingFont(ImageFont.truetype(args.font, args.font_size))
+        wrapper = WordWrapper(font)
+        start = time.perf_counter()
+        if label == "quadratic":
+            lines = [wrap_quadratic(font, paragraphs, args.width) for paragraphs in corpus]
+        else:
+            lines = [wrap_linear(wrapper, paragraphs, args.width) for paragraphs in corpus]
+        results[label] = (time.perf_counter() - start, font.calls, lines)
+        print(f"{label:<10} {results[label][0]:7.3f}s  font measurements {font.calls:>9}")
+
+    identical = results["quadratic"][2] == results["linear"][2]
+    print(f"speedup    {results['quadratic'][0] / results['linear'][0]:.1f}x, identical output: {identical}")
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark: CPU polar projection of vis types 0 and 5 through precomputed remap tables.
+
+Reports the one-off cost of computing the tables, then renders the projected
+480x480 wave of a generated tone with the remap fallback and, for type 0, with
+the equivalent per-pixel geq expression (the CPU graph polar.glsl replaced),
+and compares a frame from both.
+
+    python benchmarks/bench_polar_remap.py --duration 20
+"""
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image, ImageChops, ImageStat
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from viz_filters import VisualizationFilters, polar_remap_files  # noqa: E402
+
+# polar.glsl's mapping per pixel, including its wrap of the angle into the texture width
+_SRC = "mod(W/PI*(PI+atan2(H/2-Y,X-W/2)),W),H-2*hypot(H/2-Y,X-W/2)"
+GEQ_POLAR = (
+    f"format=rgba,geq=r='r({_SRC})':g='g({_SRC})':b='b({_SRC})':"
+    f"a='if(gt(hypot(H/2-Y,X-W/2),H/2),0,alpha({_SRC}))'"
+)
+
+
+def run(audio_path, auvis, duration, output_args):
+    cmd = ['ffmpeg', '-v', 'error', '-i', str(audio_path), '-filter_complex', auvis,
+           '-map', '[auvis]', '-t', str(duration), *output_args]
+    start = time.perf_counter()
+    result = subprocess.run(cmd, capture_output=True, check=True)
+    return time.perf_counter() - start, result.stdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=float, default=20, help='Seconds of video per run (default: 20)')
+    parser.add_argument('--frate', type=int, default=30, help='Frame rate (default: 30)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        for shader in ('polar', 'circle'):
+            start = time.perf_counter()
+            polar_remap_files(shader, 480, 480, Path(work_dir) / "maps")
+            print(f"{shader} tables computed in {1000 * (time.perf_counter() - start):.0f} ms")
+
+        audio_path = Path(work_dir) / "tone.mp3"
+        subprocess.run(['ffmpeg', '-v', 'error', '-f', 'lavfi', '-i',
+                        f'sine=frequency=220:duration={args.duration},volume=8', '-ac', '2', str(audio_path), '-y'],
+                       check=True)
+
+        frames = args.duration * args.frate
+        null_args = ['-f', 'null', '-']
+        frame_args = ['-ss', str(args.duration / 2), '-frames:v', '1', '-pix_fmt', 'rgba', '-f', 'rawvideo', '-']
+        print(f"{'type':<5} {'graph':<6} {'fps':>8} {'mean diff':>10}")
+        for vis_type in (0, 5):
+            viz = VisualizationFilters(vis_type=vis_type, frate=args.frate, polar_backend='remap',
+                                       map_dir=Path(work_dir) / "maps")
+            auvis, _ = viz._create_audio_visualization_filter(audio_label='0:a')
+            variants = [("remap", auvis)]
+            if vis_type == 0:
+                wave = auvis.split("format=rgba[wave]")[0]
+                variants.append(("geq", wave + GEQ_POLAR + "[auvis]"))
+            reference = None
+            for label, graph in variants:
+                elapsed, _ = run(audio_path, graph, args.duration, null_args)
+                _, data = run(audio_path, graph, args.duration, frame_args)
+                frame = Image.frombytes('RGBA', (480, 480), data)
+                diff_column = ""
+                if reference is not None:
+                    diff = ImageChops.difference(reference, frame)
+                    diff_column = f" {sum(ImageStat.Stat(diff).mean) / 4:10.3f}"
+                reference = frame
+                print(f"{vis_type:<5} {label:<6} {frames / elapsed:8.1f}{diff_column}")
+
+
+if __name__ == "__main__":
+    main()
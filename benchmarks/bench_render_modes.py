@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-track segments + concat vs single ffmpeg per batch.
+
+Renders the same tracks with both --render-mode values and reports wall-clock
+time, bytes written to disk by ffmpeg (Linux block I/O accounting) and the size
+of the files left in the output folder.
+
+    python benchmarks/bench_render_modes.py ./music --tracks 10 --test 30 --vis-type 1
+"""
+
+import argparse
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core import MP3ToVideoConverter  # noqa: E402
+
+
+def folder_bytes(folder):
+    return sum(f.stat().st_size for f in Path(folder).rglob('*')
+               if f.is_file() and f.suffix != '.sqlite' and 'segment_cache' not in f.parts)
+
+
+def run_mode(input_folder, work_dir, mode, args):
+    output_folder = Path(work_dir) / mode
+    converter = MP3ToVideoConverter(
+        input_folder=input_folder,
+        output_folder=str(output_folder),
+        batch_size=args.tracks,
+        font=args.font,
+        vis_type=args.vis_type,
+        test=args.test,  # test mode keeps the temp folder, so intermediate files are counted
+        log_callback=lambda message: None,
+        use_tqdm=False,
+        segment_cache_size=0,
+        render_mode=mode,
+    )
+    mp3_files = converter.get_mp3_files()[:args.tracks]
+    blocks_before = resource.getrusage(resource.RUSAGE_CHILDREN).ru_oublock
+    start = time.perf_counter()
+    converter.create_video_for_batch(mp3_files, 0)
+    elapsed = time.perf_counter() - start
+    written = (resource.getrusage(resource.RUSAGE_CHILDREN).ru_oublock - blocks_before) * 512
+    return elapsed, written, folder_bytes(output_folder)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input_folder', help='Folder containing MP3 files')
+    parser.add_argument('--tracks', type=int, default=10, help='Tracks in the benchmark batch (default: 10)')
+    parser.add_argument('--test', type=float, default=30, help='Seconds rendered per track (default: 30)')
+    parser.add_argument('--vis-type', type=int, default=1, help='Visualization type (default: 1)')
+    parser.add_argument('--font', default='arial.ttf', help='Font file (default: arial.ttf)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        print(f"{'mode':<10} {'wall s':>8} {'disk MB':>9} {'files MB':>9}")
+        for mode in ('segments', 'single'):
+            elapsed, written, files = run_mode(args.input_folder, work_dir, mode, args)
+            print(f"{mode:<10} {elapsed:8.2f} {written / 1e6:9.2f} {files / 1e6:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
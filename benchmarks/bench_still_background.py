@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark: CPU time of a track segment with a looped image input versus a still frame.
+
+Renders the plain and the scrolling-lyrics segment graphs over a generated tone,
+once with the background read through the image demuxer on every frame
+(-stream_loop 1 / -loop 1, the previous inputs) and once decoded a single time
+and repeated by the loop filter, and reports the ffmpeg CPU time (user + system)
+per minute of video. Output goes to the null muxer unless --codec is given, so
+the numbers show the decode and filtering cost without the encoder.
+
+    python benchmarks/bench_still_background.py --duration 60 --vis-type 1
+"""
+
+import argparse
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core import MP3ToVideoConverter  # noqa: E402
+
+
+def make_fixture(work_dir, duration):
+    audio_path = Path(work_dir) / "tone.mp3"
+    subprocess.run(['ffmpeg', '-v', 'error', '-f', 'lavfi', '-i', f'sine=frequency=220:duration={duration}',
+                    '-ac', '2', '-b:a', '192k', str(audio_path), '-y'], check=True)
+    background = Image.effect_mandelbrot((1920, 1080), (-2.0, -1.0, 1.0, 1.0), 80).convert('RGB')
+    bg_path = Path(work_dir) / "bg.jpg"
+    background.save(bg_path, 'JPEG', quality=95)
+    lyrics_height = 6000
+    lyrics_path = Path(work_dir) / "lyrics.png"
+    Image.effect_mandelbrot((600, lyrics_height), (-2.0, -3.0, 1.0, 3.0), 40).convert('RGBA').save(lyrics_path)
+    return audio_path, bg_path, lyrics_path, lyrics_height
+
+
+def segment_command(converter, audio_path, bg_path, lyrics_path, lyrics_height, duration, looped, output_args):
+    bg_input = ['-i', str(bg_path)]
+    lyrics_input = []
+    audio_label = '1:a'
+    lyrics_label = None
+    scroll_speed = 0
+    if lyrics_path:
+        lyrics_input = ['-i', str(lyrics_path)]
+        audio_label = '2:a'
+        lyrics_label = '1:v'
+        scroll_speed = (lyrics_height + 1080) / duration
+    graph = converter._track_filter_complex(converter.viz_filters, '0:v', audio_label, lyrics_label=lyrics_label,
+                                            scroll_speed=scroll_speed, duration=duration)
+    if looped:
+        # The previous inputs: the demuxer loops the image and every frame is decoded again
+        bg_input = (['-loop', '1'] if lyrics_path else ['-stream_loop', '1']) + bg_input
+        still = graph.split('[0:v]', 1)[1].split(';', 1)[0]
+        graph = graph.replace(f"[0:v]{still}", f"[0:v]fps={converter.frate}[still]")
+    return ['ffmpeg', '-v', 'error', '-filter_complex_threads', '0', *bg_input, *lyrics_input,
+            '-i', str(audio_path), '-filter_complex', graph, '-map', '[outv]', '-an',
+            '-t', str(duration), '-shortest', '-r', str(converter.frate), *output_args]
+
+
+def cpu_seconds(cmd):
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start = time.perf_counter()
+    subprocess.run(cmd, check=True)
+    wall = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime), wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=float, default=60, help='Seconds of video per run (default: 60)')
+    parser.add_argument('--frate', type=int, default=30, help='Frame rate (default: 30)')
+    parser.add_argument('--vis-type', type=int, default=1, help='Visualization type (default: 1)')
+    parser.add_argument('--codec', help='Encode with this codec instead of writing to the null muxer')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        audio_path, bg_path, lyrics_path, lyrics_height = make_fixture(work_dir, args.duration)
+        converter = MP3ToVideoConverter(work_dir, Path(work_dir) / "out", frate=args.frate, vis_type=args.vis_type,
+                                        log_callback=lambda message: None, use_tqdm=False)
+        if args.codec:
+            output_args = ['-c:v', args.codec, '-pix_fmt', 'yuv420p', str(Path(work_dir) / "out.mp4"), '-y']
+        else:
+            output_args = ['-pix_fmt', 'yuv420p', '-f', 'null', '-']
+
+        minutes = args.duration / 60
+        print(f"{'path':<7} {'input':<12} {'CPU s/min':>10} {'wall s/min':>11}")
+        for path_label, lyrics in (("plain", None), ("lyrics", lyrics_path)):
+            for input_label, looped in (("looped", True), ("still", False)):
+                cmd = segment_command(converter, audio_path, bg_path, lyrics, lyrics_height, args.duration,
+                                      looped, output_args)
+                cpu, wall = cpu_seconds(cmd)
+                print(f"{path_label:<7} {input_label:<12} {cpu / minutes:10.2f} {wall / minutes:11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: outlined text rendering for a batch of track backgrounds.
+
+Draws the strings of every background in a batch (track list rows, highlighted
+row, title, artist and info line) with the previous multi-pass outline renderer
+and with cached single-rasterisation sprites, and reports the time and the pixel
+difference between the two.
+
+    python benchmarks/bench_text_outline.py --tracks 30 --font arial.ttf
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from compositor import BackgroundCompositor, outline_color_for  # noqa: E402
+
+
+def draw_text_multipass(draw, position, text, font, fill, outline_width):
+    """The previous renderer: one draw.text call per outline ring offset plus the fill."""
+    x, y = position
+    outline_color = outline_color_for(fill)
+    for dx in range(-outline_width, outline_width + 1):
+        for dy in range(-outline_width, outline_width + 1):
+            if abs(dx) == outline_width or abs(dy) == outline_width:
+                draw.text((x + dx, y + dy), text, font=font, fill=outline_color)
+    draw.text((x, y), text, font=font, fill=fill)
+
+
+def batch_strings(tracks, fonts):
+    """Yield (track_index, [(position, text, font, fill, outline_width), ...]) per background."""
+    lines = [f"{i + 1}. Track number {i + 1} - Some Artist" for i in range(tracks)]
+    white = (255, 255, 255)
+    for current in range(tracks):
+        items = []
+        for i, line in enumerate(lines):
+            if i == current:
+                items.append(((50, 100 + 30 * i), line, fonts['highlight'], (255, 255, 0), 2))
+            else:
+                items.append(((50, 100 + 30 * i), line, fonts['list'], white, 1))
+        items.append(((700, 520), f"Benchmark Title {current + 1}", fonts['title'], white, 3))
+        items.append(((800, 570), "Some Artist", fonts['info'], white, 2))
+        items.append(((820, 615), "Some Album | Genre | 2024", fonts['list'], white, 2))
+        yield current, items
+
+
+def render(base, tracks, fonts, cached):
+    compositor = BackgroundCompositor()
+    images = []
+    start = time.perf_counter()
+    for _, items in batch_strings(tracks, fonts):
+        image = base.copy()
+        draw = ImageDraw.Draw(image)
+        for position, text, font, fill, outline_width in items:
+            if cached:
+                compositor.text_sprite(text, font, fill, outline_width).paste(image, position)
+            else:
+                draw_text_multipass(draw, position, text, font, fill, outline_width)
+        images.append(image)
+    return time.perf_counter() - start, images
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tracks', type=int, default=30, help='Tracks in the batch (default: 30)')
+    parser.add_argument('--font', default='arial.ttf', help='Font file (default: arial.ttf)')
+    args = parser.parse_args()
+
+    fonts = {
+        'title': ImageFont.truetype(args.font, 40),
+        'info': ImageFont.truetype(args.font, 30),
+        'list': ImageFont.truetype(args.font, 20),
+        'highlight': ImageFont.truetype(args.font, 24),
+    }
+    base = Image.effect_mandelbrot((1920, 1080), (-2.0, -1.0, 1.0, 1.0), 60).convert('RGB')
+
+    old_time, old_images = render(base, args.tracks, fonts, cached=False)
+    new_time, new_images = render(base, args.tracks, fonts, cached=True)
+
+    max_diff = 0
+    changed = 0
+    for old, new in zip(old_images, new_images):
+        diff = ImageChops.difference(old, new).convert('L')
+        max_diff = max(max_diff, diff.getextrema()[1])
+        changed += sum(diff.point(lambda v: 255 if v > 32 else 0).histogram()[255:])
+
+    print(f"multi-pass  total {old_time:7.3f}s  per track {1000 * old_time / args.tracks:7.1f} ms")
+    print(f"sprites     total {new_time:7.3f}s  per track {1000 * new_time / args.tracks:7.1f} ms")
+    print(f"speedup     {old_time / new_time:.1f}x")
+    print(f"difference  max {max_diff}, pixels off by more than 32 per track: {changed / args.tracks:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark: frames per second of each visualization type's filter graph.
+
+Renders a still background with the visualization of a generated tone to the
+null muxer and reports the fps per vis type. Types 2 and 3 are also run with
+their previous full-layer graphs (a 1920x432 and a 1920x1080 RGBA overlay) for
+comparison with the region-minimal strips, together with the largest and mean
+pixel difference of a frame from both. Type 8 draws no waveform per frame (it is
+burned into the background by the converter), so its row is the cost of the
+looped 4-pixel playhead overlay alone.
+
+    python benchmarks/bench_vis_overlay.py --duration 30 --types 1 2 3 4 8 [--codec libx264]
+"""
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image, ImageChops, ImageStat
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from viz_filters import VisualizationFilters  # noqa: E402
+
+
+def legacy_filter(viz, audio_in, video_in, out):
+    """The previous full-layer graphs of vis types 2 and 3."""
+    wave = f"{audio_in}aformat=sample_fmts=fltp:sample_rates={viz.afreq}:channel_layouts=stereo,"
+    if viz.vis_type == 2:
+        return (
+            wave + f"showwaves=mode=cline:draw=full:s=720x108:colors={viz.wavecolor2}|{viz.wavecolor}:rate={viz.frate},"
+                   f"format=rgba,colorchannelmixer=aa=0.85,scale=1920:432:flags=fast_bilinear[auvis]",
+            f"{video_in}[auvis]overlay=x=0:y=864{out}"
+        )
+    return (
+        wave + f"showwaves=mode=cline:draw=full:s=720x108:colors={viz.wavecolor}:rate={viz.frate},"
+               f"split[wave1][wave2];"
+               f"[wave1]crop=720:54:0:54[wave1_cropped];"
+               f"[wave2]crop=720:54:0:0[wave2_cropped];"
+               f"[wave1_cropped]pad=720:216:0:0:color=0x00000000[wave1_padded];"
+               f"[wave2_cropped]pad=720:216:0:162:color=0x00000000[wave2_padded];"
+               f"[wave1_padded][wave2_padded]vstack[temp_screen];"
+               f"[temp_screen]format=rgba,colorchannelmixer=aa=0.85,scale=1920:1080:flags=fast_bilinear[auvis]",
+        f"{video_in}[auvis]overlay=x=0:y=0{out}"
+    )
+
+
+def run(bg_path, audio_path, viz, legacy, duration, output_args):
+    if legacy:
+        auvis, overlay = legacy_filter(viz, '[1:a]', '[still]', '[outv]')
+    else:
+        auvis, overlay = viz._create_audio_visualization_filter(audio_label='1:a', video_label='still',
+                                                                duration=duration)
+    graph = f"[0:v]loop=loop=-1:size=1,setpts=N/({viz.frate}*TB)[still];{auvis};{overlay}"
+    cmd = ['ffmpeg', '-v', 'error', '-i', str(bg_path), '-i', str(audio_path), '-filter_complex', graph,
+           '-map', '[outv]', '-t', str(duration), '-r', str(viz.frate), *output_args]
+    start = time.perf_counter()
+    result = subprocess.run(cmd, capture_output=True, check=True)
+    return time.perf_counter() - start, result.stdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=float, default=30, help='Seconds of video per run (default: 30)')
+    parser.add_argument('--frate', type=int, default=30, help='Frame rate (default: 30)')
+    parser.add_argument('--codec', help='Also encode with this codec, e.g. libx264, so fps includes the '
+                                        'encoder (default: filter graph only)')
+    parser.add_argument('--types', type=int, nargs='+', default=[1, 2, 3, 4, 8],
+                        help='Vis types to run (default: 1 2 3 4 8; 0 and 5 need libplacebo)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        audio_path = Path(work_dir) / "tone.mp3"
+        subprocess.run(['ffmpeg', '-v', 'error', '-f', 'lavfi', '-i', f'sine=frequency=220:duration={args.duration}',
+                        '-ac', '2', str(audio_path), '-y'], check=True)
+        bg_path = Path(work_dir) / "bg.png"
+        Image.effect_mandelbrot((1920, 1080), (-2.0, -1.0, 1.0, 1.0), 80).convert('RGB').save(bg_path)
+
+        frames = args.duration * args.frate
+        null_args = ['-pix_fmt', 'yuv420p', '-f', 'null', '-']
+        if args.codec:
+            null_args = ['-c:v', args.codec, '-b:v', '550k'] + null_args
+        frame_args = ['-ss', str(args.duration / 2), '-frames:v', '1', '-pix_fmt', 'rgb24', '-f', 'rawvideo', '-']
+        print(f"{'type':<5} {'graph':<8} {'fps':>8} {'max diff':>9} {'mean diff':>10}")
+        for vis_type in args.types:
+            viz = VisualizationFilters(vis_type=vis_type, frate=args.frate)
+            variants = [("legacy", True), ("strips", False)] if vis_type in (2, 3) else [("current", False)]
+            reference = None
+            for label, legacy in variants:
+                elapsed, _ = run(bg_path, audio_path, viz, legacy, args.duration, null_args)
+                _, data = run(bg_path, audio_path, viz, legacy, args.duration, frame_args)
+                frame = Image.frombytes('RGB', (1920, 1080), data)
+                diff_columns = ""
+                if reference is not None:
+                    diff = ImageChops.difference(reference, frame)
+                    max_diff = max(high for _, high in diff.getextrema())
+                    diff_columns = f" {max_diff:9d} {sum(ImageStat.Stat(diff).mean) / 3:10.3f}"
+                reference = frame
+                print(f"{vis_type:<5} {label:<8} {frames / elapsed:8.1f}{diff_columns}")
+
+
+if __name__ == "__main__":
+    main()
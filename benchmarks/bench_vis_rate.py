@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark: encode speed against visualization frame rate.
+
+Encodes one track segment per vis type with create_video_segment at the output
+frame rate and at lower --vis-rate values, so the visualization is generated and
+composited less often and each of its frames is held for the output rate. Reports
+the encode fps, the speedup over vis_rate == frate and the segment size; the
+visualization moves vis_rate times a second, which is the smoothness given up.
+
+    python benchmarks/bench_vis_rate.py --duration 20 --frate 60 --vis-rates 60 30 20 --types 1 2 6
+"""
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core import MP3ToVideoConverter  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=float, default=20, help='Seconds of audio per segment (default: 20)')
+    parser.add_argument('--frate', type=int, default=60, help='Output frame rate (default: 60)')
+    parser.add_argument('--vis-rates', type=int, nargs='+', default=[60, 30, 20],
+                        help='Visualization frame rates to compare (default: 60 30 20)')
+    parser.add_argument('--types', type=int, nargs='+', default=[1, 2, 3, 4, 6, 8],
+                        help='Vis types to run (default: 1 2 3 4 6 8)')
+    parser.add_argument('--codec', default='libx264', help='Video codec (default: libx264)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        work_dir = Path(work_dir)
+        audio_path = work_dir / "sweep.mp3"
+        # A sweep with a beat, so every visualization frame differs from the last
+        subprocess.run(['ffmpeg', '-v', 'error', '-f', 'lavfi', '-i',
+                        f"aevalsrc='0.6*sin(2*PI*(110+40*t)*t)*(0.5+0.5*sin(2*PI*2*t))':d={args.duration}",
+                        '-ac', '2', str(audio_path), '-y'], check=True)
+        bg_path = work_dir / "bg.png"
+        Image.effect_mandelbrot((1920, 1080), (-2.0, -1.0, 1.0, 1.0), 80).convert('RGB').save(bg_path)
+        metadata = {'title': 'Benchmark', 'path': str(audio_path), 'duration': args.duration}
+
+        frames = args.duration * args.frate
+        print(f"{'type':<5} {'vis rate':>8} {'fps':>8} {'speedup':>8} {'size kB':>8}")
+        for vis_type in args.types:
+            baseline = None
+            for vis_rate in args.vis_rates:
+                converter = MP3ToVideoConverter(work_dir, work_dir / "out", frate=args.frate, codec=args.codec,
+                                                vis_type=vis_type, vis_rate=vis_rate, segment_cache_size=0,
+                                                log_callback=lambda message: None, use_tqdm=False)
+                output_path = work_dir / f"segment_{vis_type}_{vis_rate}.mp4"
+                start = time.perf_counter()
+                if not converter.create_video_segment(metadata, bg_path, output_path):
+                    print(f"{vis_type:<5} {vis_rate:>8} failed")
+                    continue
+                elapsed = time.perf_counter() - start
+                baseline = baseline or elapsed
+                print(f"{vis_type:<5} {converter.viz_filters.vis_rate:>8} {frames / elapsed:8.1f} "
+                      f"{baseline / elapsed:7.2f}x {output_path.stat().st_size / 1024:8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -51,6 +51,15 @@ pyinstaller ^
     --icon=NONE ^
     --add-data "viz_filters.py;." ^
     --add-data "core.py;." ^
+    --add-data "metadata_index.py;." ^
+    --add-data "job_state.py;." ^
+    --add-data "segment_cache.py;." ^
+    --add-data "atomic_file.py;." ^
+    --add-data "compositor.py;." ^
+    --add-data "fonts.py;." ^
+    --add-data "analysis_store.py;." ^
+    --add-data "frame_engine.py;." ^
+    --add-data "ffmpeg_progress.py;." ^
     --add-data "gui.py;." ^
     --add-data "circle.glsl;." ^
     --add-data "polar.glsl;." ^
@@ -59,6 +68,7 @@ pyinstaller ^
     --hidden-import PIL ^
     --hidden-import chardet ^
     --hidden-import tqdm ^
+    --hidden-import numpy ^
     --clean ^
     gui.py
 
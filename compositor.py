@@ -0,0 +1,426 @@
+"""
+Background compositor for Music To Visualized Video converter.
+Caches the immutable layers of a track background (blurred backdrop, rounded album
+art tile, corner mask, batch track list) so tracks sharing them reuse the pixels.
+"""
+
+import hashlib
+import io
+from collections import OrderedDict
+from pathlib import Path
+from PIL import Image, ImageChops, ImageColor, ImageDraw, ImageEnhance, ImageFilter
+
+from fonts import draw_text
+
+
+class _LayerCache:
+    """Small LRU cache for rendered layers."""
+
+    def __init__(self, max_items):
+        self.max_items = max_items
+        self._items = OrderedDict()
+
+    def get(self, key):
+        value = self._items.get(key)
+        if value is not None:
+            self._items.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+        return value
+
+
+BLUR_QUALITIES = ('fast', 'exact')
+
+# The fast blur works at 1/BLUR_DOWNSCALE of the frame size
+BLUR_DOWNSCALE = 4
+
+
+def _cover(source, width, height):
+    """Scale source to fill width x height, keeping its aspect ratio, and crop the center."""
+    # Scale to fill width, maintaining aspect ratio
+    source_ratio = source.width / source.height
+    target_ratio = width / height
+
+    if source_ratio > target_ratio:
+        # Image is wider - scale to height
+        new_height = height
+        new_width = int(new_height * source_ratio)
+    else:
+        # Image is taller - scale to width
+        new_width = width
+        new_height = int(new_width / source_ratio)
+
+    source = source.resize((new_width, new_height), Image.LANCZOS)
+
+    # Crop to center
+    left = (new_width - width) // 2
+    top = (new_height - height) // 2
+    return source.crop((left, top, left + width, top + height))
+
+
+def create_blurred_background(source, width=1920, height=1080, quality='exact', brightness=0.6):
+    """Create blurred, scaled, and darkened background from an image or image path.
+
+    quality 'exact' blurs at full resolution. 'fast' scales the source straight to
+    1/BLUR_DOWNSCALE of the frame, blurs there with a proportionally smaller radius,
+    darkens the small image and upsamples it; a radius-30 blur leaves no detail the
+    upsampling could lose.
+    """
+    if not isinstance(source, Image.Image):
+        source = Image.open(source)
+    source = source.convert('RGB')
+
+    if quality == 'fast':
+        small = _cover(source, max(1, width // BLUR_DOWNSCALE), max(1, height // BLUR_DOWNSCALE))
+        small = small.filter(ImageFilter.GaussianBlur(radius=30 / BLUR_DOWNSCALE))
+        small = Image.blend(Image.new('RGB', small.size, (0, 0, 0)), small, brightness)
+        return small.resize((width, height), Image.BICUBIC)
+
+    source = _cover(source, width, height)
+
+    # Apply blur
+    source = source.filter(ImageFilter.GaussianBlur(radius=30))
+
+    # Darken by 40%
+    enhancer = ImageEnhance.Brightness(source)
+    source = enhancer.enhance(brightness)
+
+    return source.convert('RGB')
+
+
+def parse_hex_color(value, default=(0, 0, 0)):
+    """Parse '#rrggbb' or '0xrrggbb' into an RGB tuple."""
+    try:
+        hex_color = value.replace('#', '').replace('0x', '')
+        if len(hex_color) == 6:
+            return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
+    except:
+        pass
+    return default
+
+
+def parse_color(value, default=(255, 255, 255)):
+    """Parse an ffmpeg color ('0xrrggbb', '#rrggbb' or a name, optional '@alpha') into RGB."""
+    if not value:
+        return default
+    value = str(value).split('@')[0].strip()
+    if value.lower().startswith(('0x', '#')):
+        return parse_hex_color(value, default)
+    try:
+        return ImageColor.getrgb(value)[:3]
+    except ValueError:
+        return default
+
+
+def outline_color_for(fill):
+    """Outline color giving contrast with fill (black for light text, white for dark)."""
+    if fill == (255, 255, 255) or fill[0] > 128:
+        return (0, 0, 0)
+    return (255, 255, 255)
+
+
+def font_key(font):
+    """Hashable identity of a font (file, size, face index) for keying rendered text."""
+    path = getattr(font, 'path', None)
+    if not isinstance(path, (str, Path)):
+        # In-memory fonts (load_default) are keyed by the object itself
+        return ('font', font)
+    return ('font', str(path), getattr(font, 'size', None), getattr(font, 'index', 0))
+
+
+class TextSprite:
+    """Outlined text rasterised once into coverage masks.
+
+    The glyphs are rendered a single time into fill_mask; the outline mask is that
+    mask dilated by a square of outline_width, which looks close to, but is not
+    pixel-identical with, the outline the old offset draw passes produced. Pasting the
+    outline color through outline_mask and then the fill color through fill_mask
+    draws the outlined text.
+    """
+
+    def __init__(self, text, font, fill, outline_width):
+        self.fill = fill
+        self.outline_color = outline_color_for(fill)
+        left, top, right, bottom = font.getbbox(text)
+        # Sprite covers the glyph box grown by the outline on every side
+        self.offset = (left - outline_width, top - outline_width)
+        size = (max(1, right - left + 2 * outline_width), max(1, bottom - top + 2 * outline_width))
+
+        self.fill_mask = Image.new('L', size, 0)
+        draw_text(ImageDraw.Draw(self.fill_mask), (-self.offset[0], -self.offset[1]), text, font, 255)
+        if outline_width > 0:
+            self.outline_mask = self.fill_mask.filter(ImageFilter.MaxFilter(2 * outline_width + 1))
+        else:
+            self.outline_mask = self.fill_mask
+
+    def box(self, position):
+        """Return the (left, top, right, bottom) box covered when pasted at position."""
+        x, y = position[0] + self.offset[0], position[1] + self.offset[1]
+        return (x, y, x + self.fill_mask.width, y + self.fill_mask.height)
+
+    def paste(self, image, position):
+        """Composite the sprite onto an RGB image with its text origin at position."""
+        x, y = self.box(position)[:2]
+        image.paste(self.outline_color, (x, y), self.outline_mask)
+        image.paste(self.fill, (x, y), self.fill_mask)
+
+
+class TrackListLayer:
+    """The batch track list rendered once; tracks only re-render their highlighted row.
+
+    Normal rows are merged into one pair of batch-wide masks. For a track, the
+    highlighted row's box is cleared from a copy of those masks, the rows overlapping
+    that box are merged back, and the highlight sprite plus the row drawn after it
+    are pasted on top, preserving the original top-to-bottom drawing order.
+    """
+
+    def __init__(self, lines, font, fill, origin=(50, 100), row_step=30, outline_width=1):
+        """
+        Render every row of the list.
+
+        Args:
+            lines: Track list rows, top to bottom
+            font: Font of normal rows
+            fill: Fill color of normal rows
+            origin: Text origin of the first row
+            row_step: Vertical distance between rows
+            outline_width: Outline width of normal rows
+        """
+        self.origin = origin
+        self.row_step = row_step
+        self.rows = [TextSprite(line, font, fill, outline_width) for line in lines]
+
+        boxes = [row.box(self.row_position(i)) for i, row in enumerate(self.rows)]
+        if boxes:
+            left = min(box[0] for box in boxes)
+            top = min(box[1] for box in boxes)
+            right = max(box[2] for box in boxes)
+            bottom = max(box[3] for box in boxes)
+        else:
+            left, top, right, bottom = origin[0], origin[1], origin[0] + 1, origin[1] + 1
+        self.layer_box = (left, top, right, bottom)
+        self.outline_mask = Image.new('L', (right - left, bottom - top), 0)
+        self.fill_mask = Image.new('L', (right - left, bottom - top), 0)
+        for i in range(len(self.rows)):
+            self._merge_row(self.outline_mask, self.fill_mask, i)
+
+    def row_position(self, index):
+        """Text origin of a row."""
+        return (self.origin[0], self.origin[1] + index * self.row_step)
+
+    def _local_box(self, box):
+        left, top = self.layer_box[:2]
+        return (box[0] - left, box[1] - top, box[2] - left, box[3] - top)
+
+    def _merge_row(self, outline_mask, fill_mask, index):
+        row = self.rows[index]
+        box = self._local_box(row.box(self.row_position(index)))
+        for mask, row_mask in ((outline_mask, row.outline_mask), (fill_mask, row.fill_mask)):
+            region = mask.crop(box)
+            mask.paste(ImageChops.lighter(region, row_mask), box[:2])
+
+    def paste(self, image, highlight_index=None, highlight_sprite=None):
+        """Composite the list onto image, replacing row highlight_index with highlight_sprite."""
+        outline_mask, fill_mask = self.outline_mask, self.fill_mask
+        has_highlight = highlight_sprite is not None and 0 <= (highlight_index or 0) < len(self.rows)
+        if has_highlight:
+            # Remove the replaced row, then restore neighbours whose pixels shared its box
+            outline_mask, fill_mask = outline_mask.copy(), fill_mask.copy()
+            cleared = self._local_box(self.rows[highlight_index].box(self.row_position(highlight_index)))
+            outline_mask.paste(0, cleared)
+            fill_mask.paste(0, cleared)
+            for i in range(len(self.rows)):
+                if i == highlight_index:
+                    continue
+                box = self._local_box(self.rows[i].box(self.row_position(i)))
+                if box[0] < cleared[2] and cleared[0] < box[2] and box[1] < cleared[3] and cleared[1] < box[3]:
+                    self._merge_row(outline_mask, fill_mask, i)
+
+        if self.rows:
+            image.paste(self.rows[0].outline_color, self.layer_box[:2], outline_mask)
+            image.paste(self.rows[0].fill, self.layer_box[:2], fill_mask)
+
+        if has_highlight:
+            highlight_sprite.paste(image, self.row_position(highlight_index))
+            # The next row was drawn after the highlight, so it stays on top of it
+            next_index = highlight_index + 1
+            if next_index < len(self.rows):
+                self.rows[next_index].paste(image, self.row_position(next_index))
+
+
+class AlbumArt:
+    """Embedded cover art decoded once; every derived layer is built from this image."""
+
+    def __init__(self, data, size=800):
+        """
+        Decode the art.
+
+        Args:
+            data: Encoded image bytes (e.g. an APIC frame)
+            size: Side of the square working image the layers are derived from
+        """
+        self.key = hashlib.sha1(data).hexdigest()
+        image = Image.open(io.BytesIO(data))
+        # Oversized JPEGs are scaled down by a power of two while decoding (no-op for other formats)
+        image.draft('RGB', (size, size))
+        image = image.convert('RGB')
+        self.dominant_color = image.resize((1, 1), Image.BICUBIC).getpixel((0, 0))
+        self.image = image.resize((size, size), Image.LANCZOS)
+
+
+class RawFrame:
+    """A composed frame held as packed RGB24 bytes, handed to ffmpeg through stdin."""
+
+    def __init__(self, image):
+        image = image.convert('RGB')
+        self.width, self.height = image.size
+        self.data = image.tobytes()
+
+
+class BackgroundCompositor:
+    """Builds track backgrounds from cached layers."""
+
+    def __init__(self, background=None, width=1920, height=1080, art_size=400, art_radius=20,
+                 max_layers=8, max_text_sprites=512, blur_quality='fast'):
+        """
+        Initialize the compositor.
+
+        Args:
+            background: Background image path or hex color (None = use album art)
+            width: Frame width
+            height: Frame height
+            art_size: Side of the album art tile
+            art_radius: Corner radius of the album art tile
+            max_layers: Number of blurred backdrops and art tiles kept in memory
+            max_text_sprites: Number of rendered outlined strings kept in memory
+            blur_quality: 'fast' (downsampled blur) or 'exact' (full-resolution blur)
+        """
+        self.background = background
+        self.width = width
+        self.height = height
+        self.art_size = art_size
+        self.art_radius = art_radius
+        self.blur_quality = blur_quality
+        self._backdrops = _LayerCache(max_layers)
+        self._tiles = _LayerCache(max_layers)
+        self._masks = _LayerCache(4)
+        self._track_lists = _LayerCache(2)
+        self._arts = _LayerCache(max_layers)
+        self._text_sprites = _LayerCache(max_text_sprites)
+
+    def album_art(self, data):
+        """Return the decoded AlbumArt for embedded art bytes, decoding each distinct image once."""
+        key = hashlib.sha1(data).hexdigest()
+        art = self._arts.get(key)
+        if art is None:
+            art = self._arts.put(key, AlbumArt(data))
+        return art
+
+    def _darkened_backdrop(self, source):
+        """Blurred backdrop with the semi-transparent dark overlay used for text readability."""
+        if self.blur_quality == 'fast':
+            # The black overlay is a further darkening, folded into the same blend
+            return create_blurred_background(source, self.width, self.height, quality='fast',
+                                             brightness=0.6 * (255 - 80) / 255)
+        image = create_blurred_background(source, self.width, self.height)
+        overlay = Image.new('RGBA', image.size, (0, 0, 0, 80))
+        return Image.alpha_composite(image.convert('RGBA'), overlay).convert('RGB')
+
+    def base_layer(self, album_art=None):
+        """Return (key, image) for the backdrop of a track; the image is shared, copy before drawing."""
+        if self.background:
+            # Check if it's a hex color
+            if self.background.startswith('#') or self.background.startswith('0x'):
+                key = ('color', self.background)
+                layer = self._backdrops.get(key)
+                if layer is None:
+                    color = parse_hex_color(self.background)
+                    layer = self._backdrops.put(key, Image.new('RGB', (self.width, self.height), color=color))
+                return key, layer
+            if Path(self.background).exists():
+                # It's an image path
+                key = ('image', str(Path(self.background).resolve()), Path(self.background).stat().st_mtime_ns)
+                layer = self._backdrops.get(key)
+                if layer is None:
+                    layer = self._backdrops.put(key, self._darkened_backdrop(self.background))
+                return key, layer
+        elif album_art is not None:
+            # No background specified, use album art as blurred background
+            key = ('art', album_art.key)
+            layer = self._backdrops.get(key)
+            if layer is None:
+                layer = self._backdrops.put(key, self._darkened_backdrop(album_art.image))
+            return key, layer
+
+        key = ('color', None)
+        layer = self._backdrops.get(key)
+        if layer is None:
+            layer = self._backdrops.put(key, Image.new('RGB', (self.width, self.height), color=(0, 0, 0)))
+        return key, layer
+
+    def rounded_mask(self, size, radius):
+        """Return the cached rounded-rectangle alpha mask."""
+        key = (size, radius)
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = Image.new('L', (size, size), 0)
+            mask_draw = ImageDraw.Draw(mask)
+            mask_draw.rounded_rectangle([0, 0, size - 1, size - 1], radius=radius, fill=255)
+            self._masks.put(key, mask)
+        return mask
+
+    def album_art_tile(self, album_art):
+        """Return the cached RGBA album art tile with rounded corners."""
+        key = album_art.key
+        tile = self._tiles.get(key)
+        if tile is None:
+            resized = album_art.image.resize((self.art_size, self.art_size), Image.LANCZOS)
+
+            # Apply mask to album art
+            tile = Image.new('RGBA', (self.art_size, self.art_size), (0, 0, 0, 0))
+            tile.paste(resized.convert('RGBA'), (0, 0), self.rounded_mask(self.art_size, self.art_radius))
+            self._tiles.put(key, tile)
+        return tile
+
+    def text_sprite(self, text, font, fill, outline_width):
+        """Return the cached TextSprite for outlined text."""
+        key = (text, font_key(font), fill, outline_width)
+        sprite = self._text_sprites.get(key)
+        if sprite is None:
+            sprite = self._text_sprites.put(key, TextSprite(text, font, fill, outline_width))
+        return sprite
+
+    def track_list_layer(self, lines, font, fill):
+        """Return the cached TrackListLayer for a batch's track list."""
+        key = (tuple(lines), font_key(font), fill)
+        layer = self._track_lists.get(key)
+        if layer is None:
+            layer = self._track_lists.put(key, TrackListLayer(lines, font, fill))
+        return layer
+
+
+def waveform_strip(peaks, size, fill, opacity=0.85):
+    """Draw a whole-track waveform as an RGBA strip.
+
+    Args:
+        peaks: One (left, right) peak pair in 0..1 per column; the left channel
+            rises above the centre line and the right channel hangs below it
+        size: (width, height) of the strip, width matching the number of peak pairs
+        fill: RGB color of the waveform
+        opacity: Alpha of the waveform over the background
+    """
+    width, height = size
+    strip = Image.new('RGBA', size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(strip)
+    color = tuple(fill) + (round(255 * opacity),)
+    middle = height // 2
+    for x, (left, right) in enumerate(peaks):
+        top = middle - max(1, round(left * (middle - 1)))
+        bottom = middle + max(1, round(right * (middle - 1)))
+        draw.line([(x, top), (x, bottom)], fill=color)
+    return strip
@@ -4,17 +4,29 @@ Contains the main MP3ToVideoConverter class used by both CLI and GUI.
 """
 
 import os
-import json
 from pathlib import Path
 from mutagen.mp3 import MP3
 from mutagen.id3 import ID3, error as ID3Error
 from PIL import Image, ImageDraw, ImageFont
 import subprocess
 import tempfile
+import shutil
 import chardet
 import random
+import math
+import copy
+import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, ALL_COMPLETED
 from tqdm import tqdm
-from viz_filters import VisualizationFilters
+from viz_filters import VisualizationFilters, WAVEFORM_STRIP
+from metadata_index import MetadataIndex
+from job_state import JobStateStore
+from segment_cache import SegmentCache
+from analysis_store import AnalysisStore, column_peaks
+from compositor import BackgroundCompositor, RawFrame, parse_color, waveform_strip
+from fonts import FontManager, draw_text
+from ffmpeg_progress import format_seconds, read_progress, read_tail
 
 
 class MP3ToVideoConverter:
@@ -24,7 +36,9 @@ class MP3ToVideoConverter:
                  font='arial.ttf', shuffle=0, frate=30, codec='libx264', vis_type=0,
                  test=False, wavecolor=None, wavecolor2=None, afreq=44100,
                  progress_callback=None, log_callback=None, use_tqdm=True, background=None,
-                 sort_type='none'):
+                 sort_type='none', jobs=1, pipeline=False, segment_cache_size=10240,
+                 render_mode='segments', audio_mode='segment', fallback_fonts=None,
+                 blur_quality='fast', bg_format='jpeg', vis_rate=None):
         """
         Initialize the converter.
 
@@ -38,7 +52,8 @@ class MP3ToVideoConverter:
             shuffle: Shuffle input files (0 or 1)
             frate: Video framerate
             codec: Video codec (e.g., 'libx264', 'h264_nvenc')
-            vis_type: Visualization type (0-5)
+            vis_type: Visualization type (0-5 ffmpeg filters, 6-7 NumPy frame engine,
+                8 static waveform strip with a moving playhead)
             test: Test mode - False, True (60s), or number of seconds
             wavecolor: Primary wave color (hex)
             wavecolor2: Secondary wave color (hex)
@@ -48,6 +63,18 @@ class MP3ToVideoConverter:
             use_tqdm: Use tqdm progress bar in CLI (default: True)
             background: Background image path or hex color (None = use album art)
             sort_type: Sorting mode - 'none', 'genre', 'album', 'artist'
+            jobs: Number of track segments rendered concurrently within a batch
+            pipeline: Overlap each batch's concat/bookkeeping with the next batch's rendering
+            segment_cache_size: Segment cache cap in MB (0 disables the cache)
+            render_mode: 'segments' (one ffmpeg per track + concat) or 'single' (one ffmpeg per batch)
+            audio_mode: Audio path for segment rendering - 'segment' (AAC per segment),
+                'batch' (one continuous AAC encode per batch) or 'copy' (keep source MP3 audio)
+            fallback_fonts: Font files used, in order, for characters missing from font
+            blur_quality: Backdrop blur - 'fast' (downsampled) or 'exact' (full resolution)
+            bg_format: How backgrounds reach ffmpeg - 'jpeg' (q95 temp file), 'png'
+                (lossless temp file) or 'raw' (RGB frames piped through stdin, no temp file)
+            vis_rate: Frame rate the visualization is generated and composited at, each
+                frame held for the output frate (default: frate)
         """
         self.input_folder = Path(input_folder)
         self.output_folder = Path(output_folder)
@@ -65,10 +92,14 @@ class MP3ToVideoConverter:
         if isinstance(test, (int, float)) and test > 0:
             self.test_duration = test
         self.afreq = afreq
-        self.processed_files = []
         self.background = background  # None = album art, path = image, hex = color
         self.sort_type = sort_type  # 'none', 'genre', 'album', 'artist'
         self.to_process_files = []
+        self.jobs = max(1, int(jobs))
+        self.pipeline = pipeline
+        self.render_mode = render_mode
+        self.audio_mode = audio_mode
+        self.bg_format = bg_format
         self.use_tqdm = use_tqdm and not progress_callback  # Don't use tqdm if GUI callback is provided
         
         self.is_wavecolor_generate = False if wavecolor else True
@@ -81,11 +112,19 @@ class MP3ToVideoConverter:
         self.progress_callback = progress_callback
         self.log_callback = log_callback
         
+        # Resolved fonts and fallback chains for mixed-script text
+        self.fonts = FontManager(fallback_fonts, log_callback=self._log)
+        
         # Stop flag for GUI
         self._stop_flag = False
         
-        # Current ffmpeg process (for stopping)
-        self._current_ffmpeg_process = None
+        # Running ffmpeg processes, one per worker (for stopping)
+        self._ffmpeg_processes = set()
+        self._ffmpeg_lock = threading.Lock()
+        
+        # Encoded share of each track in flight, by track index, for sub-track progress
+        self._track_fractions = {}
+        self._progress_lock = threading.Lock()
         
         # Initialize visualization filters
         self.viz_filters = VisualizationFilters(
@@ -93,14 +132,37 @@ class MP3ToVideoConverter:
             frate=frate,
             afreq=afreq,
             wavecolor=self.wavecolor,
-            wavecolor2=self.wavecolor2
+            wavecolor2=self.wavecolor2,
+            map_dir=self.output_folder / "remap_cache",
+            vis_rate=vis_rate
         )
+        if self.render_mode == 'single' and self.viz_filters.uses_frame_engine():
+            # Frame engine video reaches ffmpeg through stdin, so each track needs its own process
+            self._log(f"Vis type {vis_type} renders one ffmpeg process per track, using the segments render mode")
+            self.render_mode = 'segments'
+        
+        # Cached background layers shared by all tracks with the same art or background
+        self.compositor = BackgroundCompositor(background=self.background, blur_quality=blur_quality)
+        self._text_fill_cache = {}
+        
+        # Tag summaries of input files, reused across runs while size and mtime are unchanged
+        self.metadata_index = MetadataIndex(self.output_folder / "metadata_index.sqlite")
+        
+        # Per-track job state, shared with other converters writing to the same output folder
+        self.job_state = JobStateStore(self.output_folder / "job_state.sqlite")
+        imported = self.job_state.import_legacy_json(self.output_folder / "processed_files.json")
+        if imported:
+            self._log(f"Imported {imported} processed files from processed_files.json")
         
-        # Load processed files list if exists
-        self.processed_list_file = self.output_folder / "processed_files.json"
-        if self.processed_list_file.exists():
-            with open(self.processed_list_file, 'r', encoding='utf-8') as f:
-                self.processed_files = json.load(f)
+        # Encoded segments survive failed or interrupted batches and are reused on re-runs
+        self.segment_cache = None
+        if segment_cache_size > 0:
+            self.segment_cache = SegmentCache(self.output_folder / "segment_cache",
+                                              segment_cache_size * 1024 * 1024)
+        
+        # Per-track audio analysis, decoded once and memory-mapped by the frame engine
+        digests = self.segment_cache or SegmentCache(self.output_folder / "segment_cache", 0)
+        self.analysis_store = AnalysisStore(self.output_folder / "analysis_cache", digests.file_digest)
     
     def _log(self, message):
         """Send log message to callback or print."""
@@ -114,60 +176,136 @@ class MP3ToVideoConverter:
         if self.progress_callback:
             self.progress_callback(current, total, message)
     
+    def _encode_progress(self, label, duration, report):
+        """Return an on_progress callback for run_ffmpeg_command.
+
+        report(fraction, message) receives the share of duration seconds encoded so far
+        and a status line with the encoding speed and the time left.
+        """
+        reached = [0.0]
+
+        def on_progress(update):
+            # out_time can read N/A while ffmpeg flushes, so never report going backwards
+            fraction = reached[0] = max(reached[0], update.fraction(duration))
+            message = f"{label}: {fraction:.0%}"
+            if update.speed:
+                message += f" at {update.speed:.2f}x"
+            eta = update.eta(duration)
+            if eta is not None and not update.done:
+                message += f", {format_seconds(eta)} left"
+            report(fraction, message)
+        return on_progress
+
+    def _report_track_progress(self, index, fraction, total_tracks, done_counter, message):
+        """Report batch progress counting the encoded share of every track in flight."""
+        with self._progress_lock:
+            self._track_fractions[index] = fraction
+            current = done_counter[0] + sum(self._track_fractions.values())
+        self._progress(min(current, total_tracks), total_tracks, message)
+
     def _check_stop(self):
         """Check if processing should be stopped."""
         if hasattr(self, '_stop_flag') and self._stop_flag:
             raise KeyboardInterrupt("Processing stopped by user")
     
     def stop(self):
-        """Signal the converter to stop processing and kill current ffmpeg process."""
+        """Signal the converter to stop processing and kill all running ffmpeg processes."""
         self._stop_flag = True
-        # Kill current ffmpeg process if running
-        if self._current_ffmpeg_process is not None:
+        self._terminate_ffmpeg_processes()
+
+    def _terminate_ffmpeg_processes(self):
+        """Terminate every ffmpeg process started by this converter that is still running."""
+        with self._ffmpeg_lock:
+            processes = list(self._ffmpeg_processes)
+        for process in processes:
             try:
-                self._current_ffmpeg_process.terminate()
+                process.terminate()
             except:
                 pass
     
+    def _read_track_summary(self, mp3_path):
+        """Parse one MP3 and return the tag summary stored in the metadata index."""
+        audio = MP3(mp3_path)
+        tags = audio.tags
+        if tags is None:
+            raise ID3Error("no ID3 tags")
+
+        summary = {
+            'title': self.get_id3_tag(tags, "TIT2", Path(mp3_path).stem),
+            'artist': self.get_id3_tag(tags, "TPE1", "Unknown Artist"),
+            'album': self.get_id3_tag(tags, "TALB", "Unknown Album"),
+            'genre': self.get_id3_tag(tags, "TCON", ""),
+            'year': self.get_id3_tag(tags, "TYER", "") or self.get_id3_tag(tags, "TDRC", ""),
+        }
+        summary['album_artist'] = self.get_id3_tag(tags, "TPE2", summary['artist'])
+        for key, value in summary.items():
+            summary[key], _ = self.detect_encoding(value)
+
+        summary['duration'] = audio.info.length
+        summary['has_art'] = any(hasattr(tag, 'mime') and tag.mime.startswith('image/')
+                                 for tag in tags.values())
+        summary['has_lyrics'] = self.find_lyrics_tag(tags) is not None
+        return summary
+
+    def _index_files(self, mp3_paths):
+        """Return {path: summary} for all readable files, parsing only new or changed ones."""
+        records = {}
+        fresh = {}
+        unreadable = 0
+        for mp3_path in mp3_paths:
+            key = str(mp3_path)
+            record = self.metadata_index.get(key)
+            if record is None:
+                if self.metadata_index.get_failure(key) is not None:
+                    unreadable += 1
+                    continue
+                try:
+                    record = self._read_track_summary(key)
+                except Exception as e:
+                    self._log(f"  [WARN] Could not read metadata for {Path(key).name}: {e}")
+                    self.metadata_index.put_failure(key, e)
+                    unreadable += 1
+                    continue
+                fresh[key] = record
+            records[key] = record
+        self.metadata_index.put_many(fresh)
+        self._log(f"Metadata index: {len(records) - len(fresh)} cached, {len(fresh)} parsed, "
+                  f"{unreadable} unreadable")
+        return records
+
     def get_mp3_files(self):
         """Get all MP3 files from input folder that haven't been processed yet."""
         all_mp3s = list(self.input_folder.glob("*.mp3"))
         self._log(f"Found {len(all_mp3s)} MP3 files in input folder")
 
+        if self.shuffle == 0 and self.sort_type != 'none':
+            # Sorting needs every file's tags up front; files without readable tags would fail later anyway
+            index_records = self._index_files(all_mp3s)
+            all_mp3s = [f for f in all_mp3s if str(f) in index_records]
+        else:
+            # Files are indexed as their batches are rendered; only skip the ones known to be unreadable
+            all_mp3s = [f for f in all_mp3s if self.metadata_index.get_failure(str(f)) is None]
+
         if self.shuffle != 0:
             random.shuffle(all_mp3s)
             self._log("Tracks shuffled randomly")
         elif self.sort_type != 'none':
             self._log(f"Sorting tracks by: {self.sort_type}")
-            # Sort by metadata
+            # Sort by indexed metadata
             metadata_cache = {}
             for mp3_path in all_mp3s:
-                try:
-                    tags = ID3(str(mp3_path))
-                    genre = self.get_id3_tag(tags, "TCON", "")
-                    album = self.get_id3_tag(tags, "TALB", "")
-                    artist = self.get_id3_tag(tags, "TPE1", "")
-
-                    genre, _ = self.detect_encoding(genre)
-                    album, _ = self.detect_encoding(album)
-                    artist, _ = self.detect_encoding(artist)
-
-                    # Debug: log first few files
-                    if len(metadata_cache) < 3:
-                        self._log(f"  {Path(mp3_path).name}: G='{genre}' A='{album}' AR='{artist}'")
-
-                    metadata_cache[str(mp3_path)] = {
-                        'genre': genre.lower().strip(),
-                        'album': album.lower().strip(),
-                        'artist': artist.lower().strip()
-                    }
-                except Exception as e:
-                    self._log(f"  [WARN] Could not read metadata for {Path(mp3_path).name}: {e}")
-                    metadata_cache[str(mp3_path)] = {
-                        'genre': '',
-                        'album': '',
-                        'artist': str(mp3_path).lower()
-                    }
+                record = index_records[str(mp3_path)]
+
+                # Debug: log first few files
+                if len(metadata_cache) < 3:
+                    self._log(f"  {Path(mp3_path).name}: G='{record['genre']}' A='{record['album']}' AR='{record['artist']}'")
+
+                # The index stores display defaults; sorting treats missing tags as empty
+                metadata_cache[str(mp3_path)] = {
+                    'genre': record['genre'].lower().strip(),
+                    'album': '' if record['album'] == "Unknown Album" else record['album'].lower().strip(),
+                    'artist': '' if record['artist'] == "Unknown Artist" else record['artist'].lower().strip()
+                }
 
             if self.sort_type == 'genre':
                 # Sort by genre → album → artist
@@ -217,7 +355,8 @@ class MP3ToVideoConverter:
                 meta = metadata_cache.get(key, {})
                 self._log(f"    {Path(f).name}")
 
-        self.to_process_files = [str(f) for f in all_mp3s if str(f) not in self.processed_files]
+        processed_files = self.job_state.completed_paths()
+        self.to_process_files = [str(f) for f in all_mp3s if str(f) not in processed_files]
         self._log(f"Files to process: {len(self.to_process_files)} (skipping {len(all_mp3s) - len(self.to_process_files)} already processed)")
         return self.to_process_files
     
@@ -276,44 +415,43 @@ class MP3ToVideoConverter:
     def extract_metadata(self, mp3_path):
         """Extract metadata from MP3 file."""
         try:
-            audio = MP3(mp3_path)
-            tags = ID3(mp3_path)
-
-            title = self.get_id3_tag(tags, "TIT2", Path(mp3_path).stem)
-            artist = self.get_id3_tag(tags, "TPE1", "Unknown Artist")
-            album_artist = self.get_id3_tag(tags, "TPE2", artist)
-            album = self.get_id3_tag(tags, "TALB", "Unknown Album")
-            genre = self.get_id3_tag(tags, "TCON", "")
-            year = self.get_id3_tag(tags, "TYER", "")
-            if not year:
-                year = self.get_id3_tag(tags, "TDRC", "")
+            record = self.metadata_index.get(mp3_path)
+            if record is None:
+                error = self.metadata_index.get_failure(mp3_path)
+                if error is not None:
+                    self._log(f"Skipping {Path(mp3_path).name}, unreadable and unchanged since last run: {error}")
+                    return None
+                try:
+                    record = self._read_track_summary(mp3_path)
+                except Exception as e:
+                    self.metadata_index.put_failure(mp3_path, e)
+                    raise
+                self.metadata_index.put(mp3_path, record)
 
             album_art = None
-            for tag in tags.values():
-                if hasattr(tag, 'mime') and tag.mime.startswith('image/'):
-                    album_art = tag.data
-                    break
+            lyrics = None
+            # Art and lyrics are too large for the index, so tags are read once more, only when present
+            if record['has_art'] or record['has_lyrics']:
+                tags = ID3(mp3_path)
 
-            lyrics = self.find_lyrics_tag(tags)
+                for tag in tags.values():
+                    if hasattr(tag, 'mime') and tag.mime.startswith('image/'):
+                        album_art = tag.data
+                        break
 
-            title, _ = self.detect_encoding(title)
-            artist, _ = self.detect_encoding(artist)
-            album_artist, _ = self.detect_encoding(album_artist)
-            album, _ = self.detect_encoding(album)
-            genre, _ = self.detect_encoding(genre)
-            year, _ = self.detect_encoding(year)
+                lyrics = self.find_lyrics_tag(tags)
 
-            if lyrics:
-                lyrics, _ = self.detect_encoding(lyrics)
+                if lyrics:
+                    lyrics, _ = self.detect_encoding(lyrics)
 
             return {
-                'title': title,
-                'artist': artist,
-                'album_artist': album_artist,
-                'album': album,
-                'genre': genre,
-                'year': year,
-                'duration': audio.info.length,
+                'title': record['title'],
+                'artist': record['artist'],
+                'album_artist': record['album_artist'],
+                'album': record['album'],
+                'genre': record['genre'],
+                'year': record['year'],
+                'duration': record['duration'],
                 'album_art': album_art,
                 'lyrics': lyrics,
                 'path': mp3_path
@@ -322,15 +460,15 @@ class MP3ToVideoConverter:
             self._log(f"Error processing {mp3_path}: {e}")
             return None
     
-    def create_album_art_image(self, album_art_data, output_path, size=(800, 800)):
-        """Create album art image from binary data."""
-        try:
-            with open(output_path, 'wb') as f:
-                f.write(album_art_data)
+    def load_album_art(self, album_art_data):
+        """Decode embedded album art once and derive the wave color from it.
 
-            img = Image.open(output_path)
-            resized_img = img.resize((1, 1), Image.BICUBIC)
-            bg_r, bg_g, bg_b = resized_img.convert('RGB').getpixel((0, 0))
+        Returns the AlbumArt shared by the background layers, or None if the data
+        can't be decoded.
+        """
+        try:
+            album_art = self.compositor.album_art(album_art_data)
+            bg_r, bg_g, bg_b = album_art.dominant_color
             if self.is_wavecolor_generate:
                 # Push wavecolor 30% toward white or black relative to bg
                 luminance = 0.299 * bg_r + 0.587 * bg_g + 0.114 * bg_b
@@ -346,12 +484,10 @@ class MP3ToVideoConverter:
                     wave_b = max(0, bg_b - int(bg_b * 0.3))
                 self.wavecolor = f"0x{wave_r:02x}{wave_g:02x}{wave_b:02x}"
                 self.viz_filters.wavecolor = self.wavecolor
-            img = img.resize(size, Image.LANCZOS)
-            img.save(output_path, 'JPEG', quality=95)
-            return True
+            return album_art
         except Exception as e:
             self._log(f"Error creating album art: {e}")
-            return False
+            return None
     
     def create_lyrics_image(self, lyrics_text, output_path, width=600, font_size=25):
         """Create a long image with lyrics that can be scrolled."""
@@ -360,28 +496,10 @@ class MP3ToVideoConverter:
             
             paragraphs = lyrics_text.split('\n')
             lines = []
+            wrapper = self.fonts.wrapper(font)
             
             for paragraph in paragraphs:
-                words = paragraph.split()
-                current_line = []
-                
-                for word in words:
-                    test_line = ' '.join(current_line + [word])
-                    bbox = font.getbbox(test_line) if hasattr(font, 'getbbox') else font.getsize(test_line)
-                    if hasattr(font, 'getbbox'):
-                        test_width = bbox[2] - bbox[0]
-                    else:
-                        test_width = bbox[0]
-                    
-                    if test_width <= width:
-                        current_line.append(word)
-                    else:
-                        if current_line:
-                            lines.append(' '.join(current_line))
-                        current_line = [word]
-                
-                if current_line:
-                    lines.append(' '.join(current_line))
+                lines.extend(wrapper.wrap(paragraph.split(), width))
                 lines.append('')
             
             if lines and lines[-1] == '':
@@ -396,7 +514,7 @@ class MP3ToVideoConverter:
             y = 25
             for line in lines:
                 if line:
-                    draw.text((0, y), line, font=font, fill=(200, 200, 255, 255))
+                    draw_text(draw, (0, y), line, font, (200, 200, 255, 255))
                 y += line_height
             
             img.save(output_path, 'PNG')
@@ -406,103 +524,153 @@ class MP3ToVideoConverter:
             self._log(f"Error creating lyrics image: {e}")
             return 0
     
-    def run_ffmpeg_command(self, cmd):
-        """Run FFmpeg command with proper encoding handling."""
+    def run_ffmpeg_command(self, cmd, input_data=None, on_progress=None):
+        """Run FFmpeg command with proper encoding handling.
+
+        stdout and stderr are read by their own threads while ffmpeg runs and only
+        their last lines are kept (stats lines are turned off), so memory stays flat
+        however long the encode.
+
+        Args:
+            cmd: FFmpeg command line
+            input_data: Optional data for ffmpeg's stdin: bytes (e.g. a raw frame for pipe:0),
+                or an iterable of byte chunks that is streamed while ffmpeg runs
+            on_progress: Optional callable receiving an FFmpegProgress about twice a
+                second; ffmpeg then writes -progress to stdout
+        """
+        process = None
         try:
             env = os.environ.copy()
             env['PYTHONIOENCODING'] = 'utf-8'
             
+            options = ['-nostats']
+            if on_progress:
+                options = ['-progress', 'pipe:1'] + options
+            cmd = [cmd[0], *options, *cmd[1:]]
+            
             # Store process reference for stopping
-            self._current_ffmpeg_process = subprocess.Popen(
+            process = subprocess.Popen(
                 cmd,
+                stdin=subprocess.PIPE if input_data is not None else None,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
-                encoding='utf-8',
-                errors='ignore',
                 env=env
             )
+            with self._ffmpeg_lock:
+                self._ffmpeg_processes.add(process)
+            
+            outputs = {}
             
-            stdout, stderr = self._current_ffmpeg_process.communicate()
+            def read_stdout():
+                if on_progress:
+                    try:
+                        read_progress(process.stdout, on_progress)
+                    except Exception as e:
+                        # Keep draining stdout, or ffmpeg blocks on the full pipe
+                        self._log(f"Progress reporting stopped: {e}")
+                outputs['stdout'] = read_tail(process.stdout)
             
-            if self._current_ffmpeg_process.returncode != 0:
-                raise subprocess.CalledProcessError(self._current_ffmpeg_process.returncode, cmd, stderr=stderr)
+            def read_stderr():
+                outputs['stderr'] = read_tail(process.stderr)
+            
+            readers = [threading.Thread(target=target, daemon=True) for target in (read_stdout, read_stderr)]
+            for thread in readers:
+                thread.start()
+            try:
+                if isinstance(input_data, (bytes, bytearray)):
+                    input_data = (input_data,)
+                if input_data is not None:
+                    self._stream_to_ffmpeg(process, input_data)
+                process.wait()
+            finally:
+                if process.poll() is None:
+                    # Interrupted: the readers only finish once ffmpeg exits
+                    process.terminate()
+                for thread in readers:
+                    thread.join()
+            stdout = outputs.get('stdout', '')
+            stderr = outputs.get('stderr', '')
+            
+            if process.returncode != 0:
+                raise subprocess.CalledProcessError(process.returncode, cmd, stderr=stderr)
             
-            self._current_ffmpeg_process = None
             return stdout
         except KeyboardInterrupt:
             self._log("\nProcess interrupted by user. Exiting gracefully...")
-            if self._current_ffmpeg_process:
+            if process:
                 try:
-                    self._current_ffmpeg_process.terminate()
+                    process.terminate()
                 except:
                     pass
-            self._current_ffmpeg_process = None
             raise
         except subprocess.CalledProcessError as e:
             self._log(f"FFmpeg command failed: {' '.join(cmd)}")
             self._log(f"FFmpeg stderr: {e.stderr}")
-            self._current_ffmpeg_process = None
             raise
-    
-    def _get_font(self, font_path, size, bold=False):
-        """Get font with optional bold weight."""
-        try:
-            if bold:
-                bold_variants = [
-                    font_path.replace('.ttf', 'b.ttf'),
-                    font_path.replace('.ttf', 'Bd.ttf'),
-                    font_path.replace('.ttf', 'Bold.ttf'),
-                    font_path.replace('.TTF', 'B.TTF'),
-                ]
-                for bold_path in bold_variants:
-                    if bold_path != font_path:
+        finally:
+            if process is not None:
+                with self._ffmpeg_lock:
+                    self._ffmpeg_processes.discard(process)
+
+    def _stream_to_ffmpeg(self, process, chunks, max_buffered=8):
+        """Write chunks to ffmpeg's stdin as they are produced, then close it.
+
+        A producer thread fills a queue of at most max_buffered chunks while this thread
+        writes them, so producing and encoding overlap with bounded memory. The caller
+        drains stdout and stderr so ffmpeg never blocks on a full pipe.
+        """
+        buffer = queue.Queue(maxsize=max_buffered)
+        closed = threading.Event()
+        errors = []
+        end = object()
+
+        def produce():
+            try:
+                for chunk in chunks:
+                    while not closed.is_set():
                         try:
-                            return ImageFont.truetype(bold_path, size)
-                        except:
+                            buffer.put(chunk, timeout=0.1)
+                            break
+                        except queue.Full:
                             pass
-                try:
-                    return ImageFont.truetype(font_path, size, weight='bold')
-                except TypeError:
-                    pass
-            return ImageFont.truetype(font_path, size)
-        except:
-            return ImageFont.load_default()
+                    if closed.is_set() or self._stop_flag:
+                        break
+            except Exception as e:
+                errors.append(e)
+            finally:
+                while not closed.is_set():
+                    try:
+                        buffer.put(end, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
 
-    def _create_blurred_background(self, source_image_path, width=1920, height=1080):
-        """Create blurred, scaled, and darkened background from image."""
-        from PIL import ImageFilter
-        
-        source = Image.open(source_image_path)
-        
-        # Scale to fill width, maintaining aspect ratio
-        source_ratio = source.width / source.height
-        target_ratio = width / height
-        
-        if source_ratio > target_ratio:
-            # Image is wider - scale to height
-            new_height = height
-            new_width = int(new_height * source_ratio)
-        else:
-            # Image is taller - scale to width
-            new_width = width
-            new_height = int(new_width / source_ratio)
-        
-        source = source.resize((new_width, new_height), Image.LANCZOS)
-        
-        # Crop to center
-        left = (new_width - width) // 2
-        top = (new_height - height) // 2
-        source = source.crop((left, top, left + width, top + height))
-        
-        # Apply blur
-        source = source.filter(ImageFilter.GaussianBlur(radius=30))
-        
-        # Darken by 40%
-        from PIL import ImageEnhance
-        enhancer = ImageEnhance.Brightness(source)
-        source = enhancer.enhance(0.6)
-        
-        return source.convert('RGB')
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        try:
+            while True:
+                chunk = buffer.get()
+                if chunk is end:
+                    break
+                try:
+                    process.stdin.write(chunk)
+                except (BrokenPipeError, OSError):
+                    # ffmpeg stopped reading, e.g. -t or -shortest ended the output
+                    break
+        finally:
+            closed.set()
+            try:
+                process.stdin.close()
+            except (BrokenPipeError, OSError):
+                pass
+            process.wait()
+            producer.join()
+        if errors:
+            raise errors[0]
+    
+    def _get_font(self, font_path, size, bold=False):
+        """Get font with optional bold weight, backed by the fallback chain."""
+        return self.fonts.get(font_path, size, bold)
 
     def _get_text_contrast_color(self, image, text_area):
         """Analyze background brightness and return contrasting text color (white or black)."""
@@ -521,68 +689,50 @@ class MP3ToVideoConverter:
         else:
             return (0, 0, 0)  # Black text
 
-    def _draw_text_with_outline(self, draw, position, text, font, fill, outline_width=3):
-        """Draw text with external outline that doesn't overwrite the fill color."""
-        x, y = position
-        
-        # Determine outline color (opposite of fill for contrast)
-        if fill == (255, 255, 255) or fill[0] > 128:
-            outline_color = (0, 0, 0)  # Black outline for white/light text
+    def _draw_text_with_outline(self, image, position, text, font, fill, outline_width=3):
+        """Draw text with external outline that doesn't overwrite the fill color.
+
+        The outlined string is rasterised once and cached by the compositor, so
+        repeated strings only cost a paste.
+        """
+        self.compositor.text_sprite(text, font, fill, outline_width).paste(image, position)
+
+    def create_background_image(self, metadata, output_path, album_art=None,
+                                track_list=None, current_track_index=0, vis_type=0):
+        """Create background image with track info and track list (without lyrics).
+
+        A .png output_path is written as fast lossless PNG, anything else as q95 JPEG.
+        Returns False if the image can't be composed or saved.
+        """
+        try:
+            image = self.compose_background_image(metadata, album_art, track_list, current_track_index, vis_type)
+            self._save_background(image, output_path)
+            return True
+        except Exception as e:
+            self._log(f"Error creating background image: {e}")
+            return False
+
+    @staticmethod
+    def _save_background(image, output_path):
+        """Write a background as fast lossless PNG (.png) or q95 JPEG (anything else)."""
+        if Path(output_path).suffix.lower() == '.png':
+            image.save(output_path, 'PNG', compress_level=1)
         else:
-            outline_color = (255, 255, 255)  # White outline for black/dark text
-        
-        # Draw outline pixels only (outer ring)
-        outline_positions = []
-        for dx in range(-outline_width, outline_width + 1):
-            for dy in range(-outline_width, outline_width + 1):
-                # Only include pixels on the outer edge (not the inner square)
-                if abs(dx) == outline_width or abs(dy) == outline_width:
-                    outline_positions.append((x + dx, y + dy))
-        
-        # Draw outline
-        for ox, oy in outline_positions:
-            draw.text((ox, oy), text, font=font, fill=outline_color)
-        
-        # Draw main text on top
-        draw.text((x, y), text, font=font, fill=fill)
-
-    def create_background_image(self, metadata, output_path, album_art_path=None,
-                                track_list_file=None, current_track_index=0, vis_type=0):
-        """Create background image with track info and track list (without lyrics)."""
+            image.save(output_path, 'JPEG', quality=95)
+
+    def compose_background_image(self, metadata, album_art=None, track_list=None,
+                                 current_track_index=0, vis_type=0):
+        """Compose the background image in memory and return it as an RGB image.
+
+        Args:
+            album_art: Decoded AlbumArt from load_album_art, or None
+            track_list: Rows of the batch track list, or None to omit it
+        """
         width, height = 1920, 1080
         
-        # Determine background color or image
-        bg_color = (0, 0, 0)
-        bg_image = None
-        
-        if self.background:
-            # Check if it's a hex color
-            if self.background.startswith('#') or self.background.startswith('0x'):
-                try:
-                    hex_color = self.background.replace('#', '').replace('0x', '')
-                    if len(hex_color) == 6:
-                        bg_color = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-                except:
-                    bg_color = (0, 0, 0)
-            elif Path(self.background).exists():
-                # It's an image path
-                bg_image = self._create_blurred_background(self.background)
-        
-        # If no background image or color specified, use album art as blurred background
-        if bg_image is None and not self.background:
-            if album_art_path and Path(album_art_path).exists():
-                bg_image = self._create_blurred_background(album_art_path)
-        
-        # Create image
-        if bg_image:
-            image = bg_image.copy()
-            # Add semi-transparent dark overlay for better text readability
-            overlay = Image.new('RGBA', image.size, (0, 0, 0, 80))
-            image = Image.alpha_composite(image.convert('RGBA'), overlay).convert('RGB')
-        else:
-            image = Image.new('RGB', (width, height), color=bg_color)
-        
-        draw = ImageDraw.Draw(image)
+        # Backdrop (color, blurred image or blurred album art) comes from the layer cache
+        base_key, base_layer = self.compositor.base_layer(album_art)
+        image = base_layer.copy()
 
         try:
             try:
@@ -598,58 +748,36 @@ class MP3ToVideoConverter:
 
             # Determine text contrast color based on background brightness in text area
             text_area = (50, 520, width - 100, height - 520)  # Approximate text region
-            text_fill = self._get_text_contrast_color(image, text_area)
-
-            if track_list_file and track_list_file.exists():
-                with open(track_list_file, 'r', encoding='utf-8') as f:
-                    tracks = f.readlines()
-
-                list_x = 50
-                list_y = 100
-                for i, track in enumerate(tracks):
-                    track_text = track.strip()
-                    if i == current_track_index:
-                        # Highlight current track with larger font and bright yellow
-                        self._draw_text_with_outline(draw, (list_x, list_y), track_text,
-                                                     highlight_font, fill=(255, 255, 0),
-                                                     outline_width=2)
-                    else:
-                        # Use contrast color for regular tracks
-                        self._draw_text_with_outline(draw, (list_x, list_y), track_text,
-                                                     list_font, fill=text_fill,
-                                                     outline_width=1)
-                    list_y += 30
+            text_fill = self._text_fill_cache.get(base_key)
+            if text_fill is None:
+                text_fill = self._get_text_contrast_color(image, text_area)
+                self._text_fill_cache[base_key] = text_fill
+
+            if track_list:
+                # Normal rows are rendered once per batch; only the highlight is drawn per track
+                layer = self.compositor.track_list_layer(track_list, list_font, text_fill)
+                # Highlight current track with larger font and bright yellow
+                highlight = None
+                if 0 <= current_track_index < len(track_list):
+                    highlight = self.compositor.text_sprite(track_list[current_track_index],
+                                                            highlight_font, (255, 255, 0), 2)
+                layer.paste(image, current_track_index, highlight)
             
-            if album_art_path and album_art_path.exists():
-                album_art = Image.open(album_art_path)
-                art_size = 400
-                album_art = album_art.resize((art_size, art_size), Image.LANCZOS)
-
-                # Apply rounded corners mask
-                radius = 20
-                mask = Image.new('L', (art_size, art_size), 0)
-                mask_draw = ImageDraw.Draw(mask)
-                mask_draw.rounded_rectangle([0, 0, art_size - 1, art_size - 1], radius=radius, fill=255)
-
-                # Apply mask to album art
-                album_art_rounded = Image.new('RGBA', (art_size, art_size), (0, 0, 0, 0))
-                album_art_rounded.paste(album_art.convert('RGBA'), (0, 0), mask)
-
-                # Convert main image to RGBA for compositing
-                image_rgba = image.convert('RGBA')
+            if album_art is not None:
+                art_size = self.compositor.art_size
+                album_art_rounded = self.compositor.album_art_tile(album_art)
+
                 art_x = (width - art_size) // 2
                 
-                # For bottom visualization (type 2) and top/bottom (type 3), center the block
+                # For bottom visualizations (types 2 and 8) and top/bottom (type 3), center the block
                 # For others, keep at top to avoid overlap with side visualizations
-                if vis_type in (2, 3):
+                if vis_type in (2, 3, 8):
                     art_y = 240  # Lower centered, less empty space at bottom
                 else:
                     art_y = 80
 
-                # Paste with alpha
-                image_rgba.paste(album_art_rounded, (art_x, art_y), album_art_rounded)
-                image = image_rgba
-                draw = ImageDraw.Draw(image)  # Recreate draw for RGBA image
+                # Paste with alpha (the tile's own alpha is the rounded-corner mask)
+                image.paste(album_art_rounded, (art_x, art_y), album_art_rounded)
 
             title_text = metadata['title'][:50]
             artist_text = metadata['artist'][:50]
@@ -658,30 +786,24 @@ class MP3ToVideoConverter:
             year =  metadata.get('year', '')
 
             # Calculate text positions (below album art)
-            if vis_type in (2, 3):
+            if vis_type in (2, 3, 8):
                 text_start_y = 680  # Below lowered album art
             else:
                 text_start_y = 520  # Below top album art
 
             # Draw title (largest, centered)
-            if hasattr(draw, 'textbbox'):
-                title_bbox = draw.textbbox((0, 0), title_text, font=title_font)
-                title_width = title_bbox[2] - title_bbox[0]
-            else:
-                title_width = draw.textlength(title_text, font=title_font)
+            title_bbox = title_font.getbbox(title_text)
+            title_width = title_bbox[2] - title_bbox[0]
             title_x = (width - title_width) // 2
-            self._draw_text_with_outline(draw, (title_x, text_start_y), title_text,
+            self._draw_text_with_outline(image, (title_x, text_start_y), title_text,
                                          title_font, fill=text_fill,
                                          outline_width=3)
 
             # Draw artist name
-            if hasattr(draw, 'textbbox'):
-                artist_bbox = draw.textbbox((0, 0), artist_text, font=info_font)
-                artist_width = artist_bbox[2] - artist_bbox[0]
-            else:
-                artist_width = draw.textlength(artist_text, font=info_font)
+            artist_bbox = info_font.getbbox(artist_text)
+            artist_width = artist_bbox[2] - artist_bbox[0]
             artist_x = (width - artist_width) // 2
-            self._draw_text_with_outline(draw, (artist_x, text_start_y + 50), artist_text,
+            self._draw_text_with_outline(image, (artist_x, text_start_y + 50), artist_text,
                                          info_font, fill=text_fill,
                                          outline_width=2)
 
@@ -697,56 +819,147 @@ class MP3ToVideoConverter:
             info_text = " | ".join(info_parts)
 
             if info_text:
-                if hasattr(draw, 'textbbox'):
-                    info_bbox = draw.textbbox((0, 0), info_text, font=list_font)
-                    info_width = info_bbox[2] - info_bbox[0]
-                else:
-                    info_width = draw.textlength(info_text, font=list_font)
+                info_bbox = list_font.getbbox(info_text)
+                info_width = info_bbox[2] - info_bbox[0]
                 info_x = (width - info_width) // 2
-                self._draw_text_with_outline(draw, (info_x, text_start_y + 95), info_text,
+                self._draw_text_with_outline(image, (info_x, text_start_y + 95), info_text,
                                              list_font, fill=text_fill,
                                              outline_width=2)
             
-            # Convert back to RGB for saving
-            image = image.convert('RGB')
-            image.save(output_path, 'JPEG', quality=95)
-            return True
+            return image.convert('RGB')
 
         except Exception as e:
             self._log(f"Error creating background image: {e}")
             image = image.convert('RGB')
             draw = ImageDraw.Draw(image)
             draw.text((100, 100), f"{metadata['title'][:30]} - {metadata['artist'][:30]}", fill=(255, 255, 255))
-            image.save(output_path, 'JPEG', quality=95)
-            return False
+            return image
     
-    def create_video_segment(self, metadata, image_path, output_path):
-        """Create a video segment for a single track without lyrics."""
+    def _track_filter_complex(self, viz_filters, bg_label, audio_label, out_label='outv',
+                              lyrics_label=None, scroll_speed=0, label_prefix='', duration=None):
+        """Build one track's video graph: background, optional scrolling lyrics and visualization.
+
+        Internal labels are prefixed with label_prefix so several tracks can share a graph.
+        The background input is a single decoded frame that the graph repeats, for
+        duration seconds when given and otherwise until the output is cut; with a
+        frame engine it is already the video of the track.
+        """
+        p = label_prefix
+        vis_rate = viz_filters.vis_rate
+        # Below the output rate the background and visualization are composited at
+        # vis_rate and every frame is held (fps) for the output; the lyrics still scroll
+        # at frate, so they go on top of the held frames instead of under the visualization
+        held = vis_rate < self.frate
+        still_parts = []
+        if not viz_filters.uses_frame_engine():
+            loop_count = -1
+            if duration is not None:
+                loop_count = max(1, math.ceil(duration * vis_rate)) - 1
+            still_parts = [f"[{bg_label}]loop=loop={loop_count}:size=1,setpts=N/({str(vis_rate)}*TB)[{p}still]"]
+            bg_label = f"{p}still"
+        held_parts = []
+        vis_out = out_label
+        if held:
+            vis_out = f"{p}vis"
+            held_label = f"{p}held" if lyrics_label else out_label
+            trim = f",trim=end_frame={math.ceil(duration * self.frate)}" if duration is not None else ""
+            held_parts = [f"[{vis_out}]fps={str(self.frate)}{trim}[{held_label}]"]
+        lyrics_parts = []
+        video_label = bg_label
+        if lyrics_label:
+            # The lyrics image is a single decoded frame: pad it once with a screen of
+            # transparency above and below, repeat that frame and crop the visible window,
+            # so per-frame work is a 600x1080 overlay whatever the lyrics length.
+            # The window offset reproduces the even-row positions overlay used to scroll to.
+            base, lyrics_out = (held_label, out_label) if held else (bg_label, f"{p}lurv")
+            lyrics_parts = [
+                f"[{lyrics_label}]format=rgba,pad=iw:ih+2160:0:1080:color=black@0,"
+                f"loop=loop=-1:size=1,setpts=N/({str(self.frate)}*TB),"
+                f"crop=iw:1080:0:'1080-2*floor(trunc(1080-{scroll_speed}*t)/2)'[{p}lyrics]",
+                f"[{base}][{p}lyrics]overlay=x=1270:y=0"
+                f":shortest=1,fps={str(self.frate)}[{lyrics_out}]",
+            ]
+            if not held:
+                video_label = lyrics_out
+
+        auvis_filter_part, auvis_overlay = viz_filters._create_audio_visualization_filter(
+            audio_label=audio_label, video_label=video_label, label_prefix=p, out_label=vis_out,
+            duration=duration
+        )
+        return ";".join([auvis_filter_part] + still_parts + lyrics_parts + [auvis_overlay] + held_parts)
+
+    def _segment_audio_args(self, audio_stream):
+        """Return ffmpeg output args for a segment's audio.
+
+        Only the legacy 'segment' audio mode encodes AAC per track; the other modes
+        render video-only segments and add the batch audio once in _finish_batch.
+        """
+        if self.audio_mode != 'segment':
+            return ['-an']
+        return [
+            '-map', audio_stream,
+            '-c:a', 'aac',
+            '-ar', str(self.afreq),
+            '-strict', 'experimental',
+            '-threads', '0',
+            '-b:a', f'{self.arate}k',
+        ]
+
+    def _background_input(self, background, viz_filters, audio_path, duration):
+        """Return (input args, stdin data) for a background image path or RawFrame.
+
+        Either way ffmpeg decodes one frame; _track_filter_complex repeats it. When the
+        vis type has a frame engine, stdin instead streams every frame of the track
+        with the visualization drawn onto the background.
+        """
+        engine = viz_filters.frame_engine()
+        if engine:
+            width, height = (background.width, background.height) if isinstance(background, RawFrame) else (1920, 1080)
+            return ([
+                '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+                '-s', f'{width}x{height}',
+                '-framerate', str(viz_filters.vis_rate),
+                '-i', 'pipe:0',
+            ], engine.frames(background, self.analysis_store.get(audio_path, viz_filters.vis_rate,
+                                                                 engine.needs_spectrum),
+                             duration))
+        if isinstance(background, RawFrame):
+            return ([
+                '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+                '-s', f'{background.width}x{background.height}',
+                '-framerate', str(self.frate),
+                '-i', 'pipe:0',
+            ], background.data)
+        return (['-i', str(background)], None)
+
+    def create_video_segment(self, metadata, background, output_path, viz_filters=None, on_progress=None):
+        """Create a video segment for a single track without lyrics.
+
+        background is the image path or a RawFrame piped to ffmpeg; on_progress is
+        passed to run_ffmpeg_command.
+        """
         self._log(f" Processing  : {metadata['title']}")
         
         duration = metadata['duration']
         if self.test_duration:
             duration = min(duration, self.test_duration)
         
-        auvis_filter_part, auvis_overlay = self.viz_filters._create_audio_visualization_filter(has_lyrics=False)
-        filter_complex = f"{auvis_filter_part};{auvis_overlay}"
+        viz_filters = viz_filters or self.viz_filters
+        bg_input, bg_data = self._background_input(background, viz_filters, metadata['path'], duration)
+        filter_complex = self._track_filter_complex(viz_filters, '0:v', '1:a', duration=duration)
         
         cmd = [
             'ffmpeg',
             '-filter_complex_threads', '0',
-            '-stream_loop', '1', '-i', str(image_path),
+            *bg_input,
             '-i', metadata['path'],
             '-filter_complex', filter_complex,
-            '-map', '[outv]', '-map', '1:a',
+            '-map', '[outv]',
+            *self._segment_audio_args('1:a'),
             '-c:v', self.codec,
             '-t', str(duration),
             '-pix_fmt', 'yuv420p',
             '-threads', '0',
-            '-c:a', 'aac',
-            '-ar', str(self.afreq),
-            '-strict', 'experimental',
-            '-threads', '0',
-            '-b:a', f'{self.arate}k',
             '-b:v', f'{self.vrate}k',
             '-shortest',
             '-movflags', 'faststart',
@@ -756,15 +969,20 @@ class MP3ToVideoConverter:
         ]
         
         try:
-            self.run_ffmpeg_command(cmd)
+            self.run_ffmpeg_command(cmd, bg_data, on_progress)
             return True
         except Exception as e:
             self._log(f"Error creating video segment: {e}")
             return False
     
-    def create_video_with_scrolling_lyrics(self, metadata, bg_image_path, lyrics_image_path,
-                                           lyrics_height, output_path):
-        """Create a video with scrolling lyrics."""
+    def create_video_with_scrolling_lyrics(self, metadata, background, lyrics_image_path,
+                                           lyrics_height, output_path, viz_filters=None, on_progress=None,
+                                           fallback=True):
+        """Create a video with scrolling lyrics.
+
+        If the encode fails and fallback is set, the track is rendered without lyrics
+        by create_video_segment instead; with fallback unset the caller handles that.
+        """
         self._log(f" Processing with lyrics : {metadata['title']}")
         
         duration = metadata['duration']
@@ -773,37 +991,25 @@ class MP3ToVideoConverter:
         
         scroll_speed = (lyrics_height + 1080) / duration
         
-        auvis_filter_part, auvis_overlay = self.viz_filters._create_audio_visualization_filter(has_lyrics=True)
-        
-        if "[0:v][auvis]overlay" in auvis_overlay:
-            auvis_overlay_for_lyrics = auvis_overlay.replace("[0:v][auvis]overlay", "[lurv][auvis]overlay")
-        else:
-            auvis_overlay_for_lyrics = "[lurv][auvis]overlay=x=720:y=600[outv]"
-        
-        filter_complex = (
-            f"{auvis_filter_part};"
-            f"[1:v]scale=600:-1:flags=fast_bilinear,format=rgba [lyrics]; "
-            f"[0:v][lyrics]overlay=x=1270:y='if(gte(t,0), (H)-{scroll_speed}*t, 0)':shortest=1,fps={str(self.frate)}[lurv];"
-            f"{auvis_overlay_for_lyrics}"
-        )
+        viz_filters = viz_filters or self.viz_filters
+        bg_input, bg_data = self._background_input(background, viz_filters, metadata['path'], duration)
+        filter_complex = self._track_filter_complex(viz_filters, '0:v', '2:a',
+                                                    lyrics_label='1:v', scroll_speed=scroll_speed,
+                                                    duration=duration)
         
         cmd = [
             'ffmpeg',
             '-filter_complex_threads', '0',
-            '-loop', '1', '-i', str(bg_image_path),
-            '-loop', '1', '-i', str(lyrics_image_path),
+            *bg_input,
+            '-i', str(lyrics_image_path),
             '-i', metadata['path'],
             '-filter_complex', filter_complex,
-            '-map', '[outv]', '-map', '2:a',
+            '-map', '[outv]',
+            *self._segment_audio_args('2:a'),
             '-c:v', self.codec,
             '-t', str(duration),
             '-pix_fmt', 'yuv420p',
             '-threads', '0',
-            '-c:a', 'aac',
-            '-ar', str(self.afreq),
-            '-strict', 'experimental',
-            '-threads', '0',
-            '-b:a', f'{self.arate}k',
             '-b:v', f'{self.vrate}k',
             '-shortest',
             '-movflags', 'faststart',
@@ -813,25 +1019,304 @@ class MP3ToVideoConverter:
         ]
         
         try:
-            self.run_ffmpeg_command(cmd)
+            self.run_ffmpeg_command(cmd, bg_data, on_progress)
             return True
         except Exception as e:
             self._log(f"Error creating video with scrolling lyrics: {e}")
-            return self.create_video_segment(metadata, bg_image_path, output_path)
+            if not fallback:
+                return False
+            self._log(f" Falling back to a segment without lyrics : {metadata['title']}")
+            return self.create_video_segment(metadata, background, output_path, viz_filters, on_progress)
     
-    def create_video_for_batch(self, batch_files, batch_index):
-        """Create a video for a batch of MP3 files."""
-        if not batch_files:
+    def create_batch_video_single_pass(self, tracks, output_path):
+        """Render a whole batch of prepared tracks with a single ffmpeg process.
+
+        Every track keeps its own background, lyrics and visualization chain. The chains
+        and the track audio are joined with the concat filter, so there is no per-track
+        process startup, no segment files and no separate concat pass.
+        """
+        self._log(f" Processing {len(tracks)} tracks in one pass")
+
+        input_args = []
+        chains = []
+        concat_inputs = ""
+        input_index = 0
+        total_duration = 0
+        for n, track in enumerate(tracks):
+            metadata = track['metadata']
+            duration = metadata['duration']
+            if self.test_duration:
+                duration = min(duration, self.test_duration)
+            total_duration += duration
+            p = f"t{n}_"
+
+            bg_label = f"{input_index}:v"
+            input_args += ['-i', str(track['background'])]
+            input_index += 1
+
+            lyrics_label = None
+            scroll_speed = 0
+            if track['lyrics_height'] > 0:
+                lyrics_label = f"{input_index}:v"
+                scroll_speed = (track['lyrics_height'] + 1080) / duration
+                input_args += ['-i', str(track['lyrics_image_path'])]
+                input_index += 1
+
+            audio_index = input_index
+            input_args += ['-t', str(duration), '-i', metadata['path']]
+            input_index += 1
+
+            chains.append(f"[{audio_index}:a]asplit[{p}avis][{p}aout]")
+            chains.append(self._track_filter_complex(track['viz_filters'], bg_label, f"{p}avis",
+                                                     out_label=f"{p}v", lyrics_label=lyrics_label,
+                                                     scroll_speed=scroll_speed, label_prefix=p,
+                                                     duration=duration))
+            # concat needs identical stream parameters from every track
+            chains.append(f"[{p}v]fps={str(self.frate)},setsar=1[{p}cv]")
+            chains.append(f"[{p}aout]aformat=sample_fmts=fltp:sample_rates={self.afreq}:channel_layouts=stereo[{p}ca]")
+            concat_inputs += f"[{p}cv][{p}ca]"
+
+        filter_complex = ";".join(chains) + f";{concat_inputs}concat=n={len(tracks)}:v=1:a=1[outv][outa]"
+
+        cmd = [
+            'ffmpeg',
+            '-filter_complex_threads', '0',
+            *input_args,
+            '-filter_complex', filter_complex,
+            '-map', '[outv]', '-map', '[outa]',
+            '-c:v', self.codec,
+            '-pix_fmt', 'yuv420p',
+            '-threads', '0',
+            '-c:a', 'aac',
+            '-ar', str(self.afreq),
+            '-b:a', f'{self.arate}k',
+            '-b:v', f'{self.vrate}k',
+            '-movflags', 'faststart',
+            '-r', str(self.frate),
+            str(output_path),
+            '-y'
+        ]
+
+        on_progress = None
+        if not self.use_tqdm:
+            on_progress = self._encode_progress(
+                f"Batch of {len(tracks)} tracks", total_duration,
+                lambda fraction, message: self._progress(fraction * len(tracks), len(tracks), message)
+            )
+
+        try:
+            self.run_ffmpeg_command(cmd, on_progress=on_progress)
+            return True
+        except Exception as e:
+            self._log(f"Error creating single-pass batch video: {e}")
             return False
+
+    def _prepare_track(self, i, metadata, temp_path, track_list):
+        """Decode album art and create the background and lyrics images for one track.
+
+        Runs on the batch thread, so per-track state such as the generated wave
+        color is snapshotted into a private VisualizationFilters copy for the worker.
+        """
+        album_art = None
+        if metadata['album_art']:
+            album_art = self.load_album_art(metadata['album_art'])
+
+        self._check_stop()
+        background = self.compose_background_image(metadata, album_art, track_list, i,
+                                                   vis_type=self.vis_type)
+        if self.vis_type == 8:
+            # Burn the whole rendered length of the track into the background once
+            duration = metadata['duration']
+            if self.test_duration:
+                duration = min(duration, self.test_duration)
+            envelope = self.analysis_store.get_envelope(metadata['path'])
+            x, y, width, height = WAVEFORM_STRIP
+            strip = waveform_strip(column_peaks(envelope, width, duration), (width, height),
+                                   parse_color(self.viz_filters.wavecolor))
+            background.paste(strip, (x, y), strip)
+        bg_format = self.bg_format
+        if bg_format == 'raw' and self.render_mode == 'single':
+            # One ffmpeg reads every background of the batch, but only one can come through stdin
+            bg_format = 'png'
+        if bg_format == 'raw' or self.viz_filters.uses_frame_engine():
+            # The frame engine draws on the background pixels, so they stay in memory
+            background = RawFrame(background)
+        else:
+            bg_image_path = temp_path / f"bg_{i}.{'png' if bg_format == 'png' else 'jpg'}"
+            self._save_background(background, bg_image_path)
+            background = bg_image_path
+
+        if self.viz_filters.uses_frame_engine():
+            # Analyse the track here, ahead of the worker that renders it
+            self.analysis_store.get(metadata['path'], self.viz_filters.vis_rate,
+                                    self.viz_filters.frame_engine().needs_spectrum)
+
+        self._check_stop()
+        lyrics_image_path = None
+        lyrics_height = 0
+        if metadata['lyrics']:
+            lyrics_image_path = temp_path / f"lyrics_{i}.png"
+            lyrics_height = self.create_lyrics_image(metadata['lyrics'], lyrics_image_path, 600, 25)
+
+        return {
+            'index': i,
+            'metadata': metadata,
+            'background': background,
+            'lyrics_image_path': lyrics_image_path,
+            'lyrics_height': lyrics_height,
+            'segment_path': temp_path / f"segment_{i}.mp4",
+            'viz_filters': copy.copy(self.viz_filters),
+        }
+
+    def _render_track(self, track, total_tracks, done_counter):
+        """Encode one prepared track into its segment file (runs in a worker thread)."""
+        self._check_stop()
+        metadata = track['metadata']
+        on_progress = None
+        if not self.use_tqdm:
+            worker = threading.current_thread().name
+            self._progress(done_counter[0], total_tracks, f"[{worker}] Processing track: {metadata['title']}")
+            duration = metadata['duration']
+            if self.test_duration:
+                duration = min(duration, self.test_duration)
+            on_progress = self._encode_progress(
+                f"[{worker}] {metadata['title']}", duration,
+                lambda fraction, message: self._report_track_progress(track['index'], fraction, total_tracks,
+                                                                      done_counter, message)
+            )
+
+        cache_key = None
+        if self.segment_cache:
+            background = track['background']
+            assets = [background.data if isinstance(background, RawFrame) else background]
+            if track['lyrics_height'] > 0:
+                assets.append(track['lyrics_image_path'])
+            cache_key = self.segment_cache.make_key(metadata['path'], assets,
+                                                    self._segment_cache_params(track['viz_filters']))
+            if self.segment_cache.fetch(cache_key, track['segment_path']):
+                self._log(f" Reusing cached segment : {metadata['title']}")
+                return track
+
+        success = False
+        if track['lyrics_height'] > 0:
+            success = self.create_video_with_scrolling_lyrics(
+                metadata, track['background'], track['lyrics_image_path'],
+                track['lyrics_height'], track['segment_path'], track['viz_filters'], on_progress,
+                fallback=False
+            )
+            if not success:
+                # The segment no longer matches its cache key, which includes the lyrics image
+                self._log(f" Falling back to a segment without lyrics : {metadata['title']}")
+                self.create_video_segment(metadata, track['background'], track['segment_path'],
+                                          track['viz_filters'], on_progress)
+                cache_key = None
+        else:
+            success = self.create_video_segment(metadata, track['background'], track['segment_path'],
+                                                track['viz_filters'], on_progress)
+
+        if cache_key and success:
+            try:
+                self.segment_cache.store(cache_key, track['segment_path'])
+            except Exception as e:
+                # The segment itself is fine; it just won't be reused
+                self._log(f" [WARN] Could not cache segment of {metadata['title']}: {e}")
+        return track
+
+    def _segment_cache_params(self, viz_filters):
+        """Return every setting that changes the bytes of an encoded segment."""
+        params = {
+            'codec': self.codec,
+            'vrate': self.vrate,
+            'arate': self.arate,
+            'frate': self.frate,
+            'afreq': self.afreq,
+            'vis_type': self.vis_type,
+            'wavecolor': viz_filters.wavecolor,
+            'wavecolor2': viz_filters.wavecolor2,
+            'duration': self.test_duration,
+            'audio_mode': self.audio_mode,
+        }
+        if viz_filters.uses_polar_projection():
+            # The circular types look slightly different through the CPU remap fallback
+            params['polar_backend'] = viz_filters.resolved_polar_backend()
+        if viz_filters.vis_rate != self.frate:
+            params['vis_rate'] = viz_filters.vis_rate
+        return params
+
+    def _collect_rendered_tracks(self, pending, video_segments, done_counter, progress_bar, return_when):
+        """Wait for rendering futures and store finished segment names by track index."""
+        done, not_done = wait(pending, return_when=return_when)
+        for future in done:
+            track = future.result()
+            video_segments[track['index']] = track['segment_path'].name
+            self.job_state.mark_rendered([track['metadata']['path']])
+            with self._progress_lock:
+                done_counter[0] += 1
+                self._track_fractions.pop(track['index'], None)
+            if progress_bar is not None:
+                progress_bar.update(1)
+            self._log(f" File {track['metadata']['title']} processed to {track['segment_path'].name} ")
+        return not_done
+
+    def _render_segments(self, metadata_list, temp_path, track_list, batch_index):
+        """Prepare and encode one segment per track; returns segment names in track order."""
+        total_tracks = len(metadata_list)
+        # Segment names are stored by track index so concat order never depends on finish order
+        video_segments = [None] * total_tracks
+        done_counter = [0]
+        with self._progress_lock:
+            self._track_fractions.clear()
+
+        # Use tqdm for CLI, plain callbacks for GUI
+        progress_bar = None
+        if self.use_tqdm:
+            progress_bar = tqdm(total=total_tracks, desc=f"Batch {batch_index}", unit="track")
+
+        # Images are prepared here while up to `jobs` ffmpeg encodes run in the pool
+        pending = set()
+        pool = ThreadPoolExecutor(max_workers=self.jobs, thread_name_prefix="Worker")
+        try:
+            for i, metadata in enumerate(metadata_list):
+                self._check_stop()
+                track = self._prepare_track(i, metadata, temp_path, track_list)
+                pending.add(pool.submit(self._render_track, track, total_tracks, done_counter))
+                while len(pending) > self.jobs:
+                    pending = self._collect_rendered_tracks(pending, video_segments, done_counter,
+                                                            progress_bar, FIRST_COMPLETED)
+            while pending:
+                pending = self._collect_rendered_tracks(pending, video_segments, done_counter,
+                                                        progress_bar, ALL_COMPLETED)
+            self._check_stop()
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            self._terminate_ffmpeg_processes()
+            raise
+        finally:
+            pool.shutdown(wait=True)
+            if progress_bar is not None:
+                progress_bar.close()
+
+        return video_segments
+
+    def _render_batch(self, batch_files, batch_index):
+        """Extract metadata, prepare images and encode all segments of a batch.
+
+        Returns a dict describing the rendered batch for _finish_batch, or None on failure.
+        """
+        if not batch_files:
+            return None
         
         metadata_list = []
         for mp3_path in batch_files:
             metadata = self.extract_metadata(mp3_path)
             if metadata:
                 metadata_list.append(metadata)
+            else:
+                self.job_state.release([mp3_path])
         
         if not metadata_list:
-            return False
+            return None
         
         temp_dir_context = None
         if self.test_duration:
@@ -843,97 +1328,213 @@ class MP3ToVideoConverter:
             temp_path = Path(temp_dir_context.name)
         
         try:
-            track_list_file = temp_path / "track_list.txt"
-            with open(track_list_file, 'w', encoding='utf-8') as f:
-                for i, metadata in enumerate(metadata_list):
-                    f.write(f"{i+1}. {metadata['title']} - {metadata['album_artist']}\n")
-            
-            video_segments = []
-            total_tracks = len(metadata_list)
+            track_list = [f"{i+1}. {metadata['title']} - {metadata['album_artist']}".strip()
+                          for i, metadata in enumerate(metadata_list)]
             
-            # Use tqdm for CLI, plain enumerate for GUI
-            if self.use_tqdm:
-                track_iterator = tqdm(enumerate(metadata_list), total=total_tracks, desc=f"Batch {batch_index}", unit="track")
-            else:
-                track_iterator = enumerate(metadata_list)
-            
-            for i, metadata in track_iterator:
+            video_segments = None
+            batch_video = None
+            if self.render_mode == 'single':
+                tracks = []
+                for i, metadata in enumerate(metadata_list):
+                    self._check_stop()
+                    tracks.append(self._prepare_track(i, metadata, temp_path, track_list))
+                batch_video = temp_path / "batch.mp4"
+                if not self.create_batch_video_single_pass(tracks, batch_video):
+                    raise RuntimeError(f"single-pass render of batch {batch_index} failed")
+                self.job_state.mark_rendered([metadata['path'] for metadata in metadata_list])
                 self._check_stop()
-                
-                if not self.use_tqdm:
-                    self._progress(i, total_tracks, f"Processing track: {metadata['title']}")
+            else:
+                video_segments = self._render_segments(metadata_list, temp_path, track_list, batch_index)
 
-                self._check_stop()
-                album_art_path = None
-                if metadata['album_art']:
-                    album_art_path = temp_path / f"album_art_{i}.jpg"
-                    self.create_album_art_image(metadata['album_art'], album_art_path)
+            return {
+                'batch_index': batch_index,
+                'batch_files': batch_files,
+                'metadata_list': metadata_list,
+                'temp_path': temp_path,
+                'temp_dir_context': temp_dir_context,
+                'video_segments': video_segments,
+                'batch_video': batch_video,
+            }
 
-                self._check_stop()
-                bg_image_path = temp_path / f"bg_{i}.jpg"
-                self.create_background_image(
-                    metadata, bg_image_path,
-                    album_art_path if album_art_path else None,
-                    track_list_file, i,
-                    vis_type=self.vis_type
-                )
+        except KeyboardInterrupt:
+            self._log("\nProcess interrupted by user. Exiting gracefully...")
+            self.job_state.release(batch_files)
+            if not self.test_duration and temp_dir_context:
+                temp_dir_context.cleanup()
+            raise
+        except Exception as e:
+            self._log(f"Error creating video: {e}")
+            self.job_state.release(batch_files)
+            if not self.test_duration and temp_dir_context:
+                temp_dir_context.cleanup()
+            return None
 
-                self._check_stop()
-                segment_path = temp_path / f"segment_{i}.mp4"
-
-                if metadata['lyrics']:
-                    lyrics_image_path = temp_path / f"lyrics_{i}.png"
-                    lyrics_height = self.create_lyrics_image(metadata['lyrics'], lyrics_image_path, 600, 25)
-
-                    if lyrics_height > 0:
-                        self.create_video_with_scrolling_lyrics(
-                            metadata, bg_image_path, lyrics_image_path,
-                            lyrics_height, segment_path
-                        )
-                    else:
-                        self.create_video_segment(metadata, bg_image_path, segment_path)
-                else:
-                    self.create_video_segment(metadata, bg_image_path, segment_path)
+    def _finish_batch(self, rendered):
+        """Concatenate rendered segments into the batch video and record processed files.
 
-                video_segments.append(f"segment_{i}.mp4")
-                self._log(f" File {metadata['title']} processed to segment_{i}.mp4 ")
-            
-            concat_file = temp_path / "concat_list.txt"
-            with open(concat_file, 'w', encoding='utf-8') as f:
-                for segment in video_segments:
-                    f.write(f"file '{segment}'\n")
-            
+        In pipeline mode this runs on the batch tail thread while the next batch renders.
+        """
+        batch_index = rendered['batch_index']
+        metadata_list = rendered['metadata_list']
+        temp_path = rendered['temp_path']
+        temp_dir_context = rendered['temp_dir_context']
+        video_segments = rendered['video_segments']
+        total_tracks = len(metadata_list)
+
+        try:
             output_video = self.output_folder / f"batch_{batch_index}.mp4"
-            cmd = [
-                'ffmpeg', '-f', 'concat', '-safe', '0', '-i', str(concat_file),
-                '-c', 'copy', str(output_video), '-movflags', 'faststart', '-y'
-            ]
-            
-            self.run_ffmpeg_command(cmd)
-            
-            for metadata in metadata_list:
-                self.processed_files.append(metadata['path'])
+            if rendered['batch_video'] is not None:
+                # Single-pass output is already final; just move it into place
+                shutil.move(str(rendered['batch_video']), str(output_video))
+            else:
+                concat_file = temp_path / "concat_list.txt"
+                with open(concat_file, 'w', encoding='utf-8') as f:
+                    for segment in video_segments:
+                        f.write(self._concat_list_entry(segment))
+                
+                if self.audio_mode == 'segment':
+                    cmd = [
+                        'ffmpeg', '-f', 'concat', '-safe', '0', '-i', str(concat_file),
+                        '-c', 'copy', str(output_video), '-movflags', 'faststart', '-y'
+                    ]
+                else:
+                    cmd = self._batch_audio_mux_command(concat_file, metadata_list, temp_path, output_video)
+                
+                self.run_ffmpeg_command(cmd)
             
-            with open(self.processed_list_file, 'w', encoding='utf-8') as f:
-                json.dump(self.processed_files, f, ensure_ascii=False, indent=2)
+            self.job_state.mark_concatenated([metadata['path'] for metadata in metadata_list])
             
             self._progress(total_tracks, total_tracks, f"Batch {batch_index} complete")
             return True
             
         except KeyboardInterrupt:
             self._log("\nProcess interrupted by user. Exiting gracefully...")
+            self.job_state.release(rendered['batch_files'])
             if not self.test_duration and temp_dir_context:
                 temp_dir_context.cleanup()
             raise
         except Exception as e:
             self._log(f"Error creating video: {e}")
+            self.job_state.release(rendered['batch_files'])
             return False
         finally:
             if not self.test_duration and temp_dir_context:
                 temp_dir_context.cleanup()
     
+    @staticmethod
+    def _concat_list_entry(path):
+        """Return a concat demuxer 'file' line with the path quoted safely."""
+        escaped = str(path).replace("'", "'\\''")
+        return f"file '{escaped}'\n"
+
+    def _track_video_duration(self, metadata):
+        """Return the length of a track's video segment, which ffmpeg rounds to whole frames."""
+        duration = metadata['duration']
+        if self.test_duration:
+            duration = min(duration, self.test_duration)
+        return math.floor(duration * self.frate + 0.5 - 1e-9) / self.frate
+
+    def _audio_can_be_copied(self, metadata_list):
+        """Stream copy needs every source MP3 to share sample rate and channel count."""
+        try:
+            infos = [MP3(metadata['path']).info for metadata in metadata_list]
+        except Exception:
+            return False
+        return len({(info.sample_rate, info.channels) for info in infos}) == 1
+
+    def _batch_audio_mux_command(self, concat_file, metadata_list, temp_path, output_video):
+        """Build the ffmpeg command that joins video-only segments with the batch audio.
+
+        'batch' mode decodes all tracks and encodes one continuous AAC stream; each
+        track is padded or trimmed to its segment length so audio and visualization
+        stay in sync across the whole batch. 'copy' mode keeps the source MP3 frames.
+        """
+        cmd = ['ffmpeg', '-f', 'concat', '-safe', '0', '-i', str(concat_file)]
+
+        if self.audio_mode == 'copy' and self._audio_can_be_copied(metadata_list):
+            audio_list = temp_path / "audio_list.txt"
+            with open(audio_list, 'w', encoding='utf-8') as f:
+                for metadata in metadata_list:
+                    # Relative entries would resolve against the list file's folder
+                    f.write(self._concat_list_entry(os.path.abspath(metadata['path'])))
+                    # Cut each track where its segment ends, so later tracks don't drift from their video
+                    f.write(f"outpoint {self._track_video_duration(metadata)}\n")
+            return cmd + [
+                '-f', 'concat', '-safe', '0', '-i', str(audio_list),
+                '-map', '0:v', '-map', '1:a',
+                '-c', 'copy', '-shortest',
+                str(output_video), '-movflags', 'faststart', '-y'
+            ]
+
+        if self.audio_mode == 'copy':
+            self._log("Source audio formats differ, encoding batch audio instead of copying it")
+
+        chains = []
+        labels = ""
+        for n, metadata in enumerate(metadata_list):
+            cmd += ['-i', metadata['path']]
+            chains.append(
+                f"[{n + 1}:a]aformat=sample_fmts=fltp:sample_rates={self.afreq}:channel_layouts=stereo,"
+                f"apad,atrim=end={self._track_video_duration(metadata)}[a{n}]"
+            )
+            labels += f"[a{n}]"
+        filter_complex = ";".join(chains) + f";{labels}concat=n={len(metadata_list)}:v=0:a=1[outa]"
+
+        return cmd + [
+            '-filter_complex', filter_complex,
+            '-map', '0:v', '-map', '[outa]',
+            '-c:v', 'copy',
+            '-c:a', 'aac',
+            '-ar', str(self.afreq),
+            '-b:a', f'{self.arate}k',
+            str(output_video), '-movflags', 'faststart', '-y'
+        ]
+
+    def _next_batch_index(self):
+        """Return the first unused batch index based on batch videos already in the output folder."""
+        indices = []
+        for video in self.output_folder.glob("batch_*.mp4"):
+            suffix = video.stem[len("batch_"):]
+            if suffix.isdigit():
+                indices.append(int(suffix))
+        return max(indices) + 1 if indices else 0
+
+    def _report_batch(self, batch_index, success):
+        """Log the outcome of a finished batch."""
+        if success:
+            self._log(f"Successfully created video for batch {batch_index}")
+        else:
+            self._log(f"Failed to create video for batch {batch_index}")
+
+    def create_video_for_batch(self, batch_files, batch_index):
+        """Create a video for a batch of MP3 files."""
+        rendered = self._render_batch(batch_files, batch_index)
+        if rendered is None:
+            return False
+        return self._finish_batch(rendered)
+
     def process_all(self):
-        """Process all MP3 files in batches."""
+        """Process all MP3 files in batches.
+
+        With pipeline enabled, the concat and bookkeeping tail of batch N runs on a
+        background thread while batch N+1 is prepared and encoded. Batch indices are
+        allocated by the job state store when a batch is claimed, so they do not
+        depend on which batch finishes first.
+
+        The converter is closed afterwards, so each run needs a new converter.
+        """
+        try:
+            self._process_batches()
+        finally:
+            self.close()
+
+    def close(self):
+        """Stop the job state heartbeat and close the job state and metadata index databases."""
+        self.job_state.close()
+        self.metadata_index.close()
+
+    def _process_batches(self):
+        """Claim, render and finish batches until no files are left (the body of process_all)."""
         mp3_files = self.get_mp3_files()
         
         if not mp3_files:
@@ -943,23 +1544,49 @@ class MP3ToVideoConverter:
         total_files = len(mp3_files)
         self._log(f"Found {total_files} MP3 files to process.")
         
+        first_batch_index = self._next_batch_index()
+        tail_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="BatchTail") if self.pipeline else None
+        pending_tail = None
+        remaining = list(mp3_files)
+        
         try:
-            for i in range(0, len(mp3_files), self.batch_size):
-                batch = mp3_files[i:i + self.batch_size]
-                existing_batches = len(self.processed_files) // self.batch_size
-                batch_index = existing_batches
+            while remaining:
+                self._check_stop()
+                # Claiming is atomic across processes, so concurrent converters split the work
+                batch_index, batch = self.job_state.claim_batch(remaining, self.batch_size, first_batch_index)
+                if not batch:
+                    break
+                claimed = set(batch)
+                remaining = [f for f in remaining if f not in claimed]
                 
                 self._log(f"Processing batch {batch_index} with {len(batch)} tracks...")
                 
-                success = self.create_video_for_batch(batch, batch_index)
+                rendered = self._render_batch(batch, batch_index)
+                
+                if tail_pool is None:
+                    success = rendered is not None and self._finish_batch(rendered)
+                    self._report_batch(batch_index, success)
+                    continue
                 
-                if success:
-                    self._log(f"Successfully created video for batch {batch_index}")
+                # Keep at most one batch tail in flight so bookkeeping stays in batch order
+                if pending_tail is not None:
+                    tail_index, tail_future = pending_tail
+                    self._report_batch(tail_index, tail_future.result())
+                    pending_tail = None
+                if rendered is None:
+                    self._report_batch(batch_index, False)
                 else:
-                    self._log(f"Failed to create video for batch {batch_index}")
+                    pending_tail = (batch_index, tail_pool.submit(self._finish_batch, rendered))
+            
+            if pending_tail is not None:
+                tail_index, tail_future = pending_tail
+                self._report_batch(tail_index, tail_future.result())
         except KeyboardInterrupt:
             self._log("\nProcess interrupted by user. Exiting gracefully...")
             raise
+        finally:
+            if tail_pool is not None:
+                tail_pool.shutdown(wait=True)
         
         self._log("Processing complete.")
         self._progress(total_files, total_files, "Processing complete")
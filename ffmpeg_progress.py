@@ -0,0 +1,88 @@
+"""
+ffmpeg output handling for Music To Visualized Video converter.
+Parses the key=value stream ffmpeg writes with -progress while it encodes, and keeps
+only a bounded tail of its log, so a long encode reports live progress in flat memory.
+"""
+
+from collections import deque
+
+
+# Lines of ffmpeg's stderr kept for error reports
+STDERR_TAIL_LINES = 200
+
+
+class FFmpegProgress:
+    """One -progress update.
+
+    Attributes:
+        frame: Frames written so far
+        out_time: Seconds of output written so far, or None while unknown
+        speed: Encoding speed as a multiple of real time, or None while unknown
+        done: True for the final update of the encode
+    """
+
+    def __init__(self, frame=0, out_time=None, speed=None, done=False):
+        self.frame = frame
+        self.out_time = out_time
+        self.speed = speed
+        self.done = done
+
+    @classmethod
+    def from_block(cls, fields):
+        """Build an update from the key=value fields of one -progress block."""
+        def number(key, scale=1.0):
+            try:
+                return float(fields[key].rstrip('x')) * scale
+            except (KeyError, ValueError):
+                return None
+
+        # out_time_ms is in microseconds too; older builds write only that one
+        out_time = number('out_time_us', 1e-6)
+        if out_time is None:
+            out_time = number('out_time_ms', 1e-6)
+        if out_time is not None and out_time < 0:
+            out_time = None
+        return cls(frame=int(number('frame') or 0), out_time=out_time, speed=number('speed') or None,
+                   done=fields.get('progress') == 'end')
+
+    def fraction(self, duration):
+        """Share of duration seconds written, 0..1."""
+        if self.done:
+            return 1.0
+        if not self.out_time or not duration:
+            return 0.0
+        return min(self.out_time / duration, 1.0)
+
+    def eta(self, duration):
+        """Seconds until duration seconds are written at the current speed, or None."""
+        if self.done:
+            return 0.0
+        if not self.speed or not duration:
+            return None
+        return max(duration - (self.out_time or 0.0), 0.0) / self.speed
+
+
+def format_seconds(seconds):
+    """Format seconds as M:SS or H:MM:SS."""
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+def read_progress(stream, callback):
+    """Read a -progress stream until it closes, calling callback with every FFmpegProgress."""
+    fields = {}
+    for line in stream:
+        key, sep, value = line.decode('utf-8', errors='ignore').strip().partition('=')
+        if not sep:
+            continue
+        fields[key] = value
+        if key == 'progress':
+            callback(FFmpegProgress.from_block(fields))
+            fields = {}
+
+
+def read_tail(stream, lines=STDERR_TAIL_LINES):
+    """Read a stream until it closes and return its last lines as text."""
+    tail = deque(stream, maxlen=lines)
+    return b''.join(tail).decode('utf-8', errors='ignore')
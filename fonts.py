@@ -0,0 +1,429 @@
+"""
+Font management for Music To Visualized Video converter.
+Resolves and caches fonts once, and renders mixed-script text (Latin, Cyrillic,
+CJK, ...) with a chain of fallback fonts chosen per character from each font's
+character map.
+"""
+
+import bisect
+import os
+import struct
+import threading
+from PIL import ImageFont
+
+
+def _read_cmap_ranges(path, index=0):
+    """Return sorted, merged (first, last) codepoint ranges mapped by a TrueType/OpenType font.
+
+    Reads only the table directory and the 'cmap' table. Supports single fonts and
+    collections (.ttc) with cmap subtable formats 4 (BMP) and 12 (full Unicode).
+    Raises ValueError when the file has no usable cmap.
+    """
+    with open(path, 'rb') as f:
+        def read(offset, size):
+            f.seek(offset)
+            data = f.read(size)
+            if len(data) != size:
+                raise ValueError("truncated font file")
+            return data
+
+        font_offset = 0
+        if read(0, 4) == b'ttcf':
+            num_fonts = struct.unpack('>I', read(8, 4))[0]
+            if not 0 <= index < num_fonts:
+                raise ValueError("face index out of range")
+            font_offset = struct.unpack('>I', read(12 + 4 * index, 4))[0]
+
+        num_tables = struct.unpack('>H', read(font_offset + 4, 2))[0]
+        directory = read(font_offset + 12, 16 * num_tables)
+        cmap_offset = None
+        for i in range(num_tables):
+            tag, _, offset, _ = struct.unpack('>4sIII', directory[16 * i:16 * i + 16])
+            if tag == b'cmap':
+                cmap_offset = offset
+                break
+        if cmap_offset is None:
+            raise ValueError("font has no cmap table")
+
+        num_subtables = struct.unpack('>H', read(cmap_offset + 2, 2))[0]
+        records = read(cmap_offset + 4, 8 * num_subtables)
+        subtables = {}
+        for i in range(num_subtables):
+            platform_id, encoding_id, offset = struct.unpack('>HHI', records[8 * i:8 * i + 8])
+            subtables[(platform_id, encoding_id)] = cmap_offset + offset
+
+        # Prefer full-Unicode subtables, then BMP-only ones
+        for key in ((3, 10), (0, 6), (0, 4), (3, 1), (0, 3), (0, 2), (0, 1), (0, 0)):
+            if key not in subtables:
+                continue
+            offset = subtables[key]
+            fmt = struct.unpack('>H', read(offset, 2))[0]
+            if fmt == 12:
+                length, _, num_groups = struct.unpack('>III', read(offset + 4, 12))
+                groups = read(offset + 16, 12 * num_groups)
+                ranges = [struct.unpack('>III', groups[12 * i:12 * i + 12])[:2] for i in range(num_groups)]
+                return _merge_ranges(ranges)
+            if fmt == 4:
+                length = struct.unpack('>H', read(offset + 2, 2))[0]
+                return _merge_ranges(_format4_ranges(read(offset, length)))
+        raise ValueError("no supported Unicode cmap subtable")
+
+
+def _format4_ranges(table):
+    """Codepoint ranges with a real glyph in a cmap format 4 subtable."""
+    seg_count = struct.unpack('>H', table[6:8])[0] // 2
+    end_codes = struct.unpack(f'>{seg_count}H', table[14:14 + 2 * seg_count])
+    base = 16 + 2 * seg_count
+    start_codes = struct.unpack(f'>{seg_count}H', table[base:base + 2 * seg_count])
+    base += 2 * seg_count
+    id_deltas = struct.unpack(f'>{seg_count}h', table[base:base + 2 * seg_count])
+    range_offsets_pos = base + 2 * seg_count
+    id_range_offsets = struct.unpack(f'>{seg_count}H', table[range_offsets_pos:range_offsets_pos + 2 * seg_count])
+
+    ranges = []
+    for seg in range(seg_count):
+        start, end = start_codes[seg], end_codes[seg]
+        if start == 0xFFFF:
+            continue
+        delta, range_offset = id_deltas[seg], id_range_offsets[seg]
+        if range_offset == 0:
+            # Every code maps to (code + delta); only the code hitting glyph 0 is missing
+            missing = (-delta) & 0xFFFF
+            if start <= missing <= end:
+                if start < missing:
+                    ranges.append((start, missing - 1))
+                if missing < end:
+                    ranges.append((missing + 1, end))
+            else:
+                ranges.append((start, end))
+            continue
+        # Glyph ids come from glyphIdArray, addressed relative to this idRangeOffset entry
+        run_start = None
+        for code in range(start, end + 1):
+            pos = range_offsets_pos + 2 * seg + range_offset + 2 * (code - start)
+            glyph = struct.unpack('>H', table[pos:pos + 2])[0] if pos + 2 <= len(table) else 0
+            if glyph:
+                glyph = (glyph + delta) & 0xFFFF
+            if glyph and run_start is None:
+                run_start = code
+            elif not glyph and run_start is not None:
+                ranges.append((run_start, code - 1))
+                run_start = None
+        if run_start is not None:
+            ranges.append((run_start, end))
+    return ranges
+
+
+def _merge_ranges(ranges):
+    merged = []
+    for first, last in sorted(ranges):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    return merged
+
+
+class CoverageIndex:
+    """Set of codepoints a font has glyphs for."""
+
+    def __init__(self, ranges):
+        self._starts = [first for first, _ in ranges]
+        self._ends = [last for _, last in ranges]
+
+    def __contains__(self, codepoint):
+        i = bisect.bisect_right(self._starts, codepoint) - 1
+        return i >= 0 and codepoint <= self._ends[i]
+
+
+class ProbeCoverage:
+    """Coverage found by rendering, for fonts whose cmap cannot be read.
+
+    A character is covered when its glyph differs from the font's missing-glyph
+    box; results are memoised per character.
+    """
+
+    def __init__(self, font):
+        self.font = font
+        self._notdef = self._render('\U0010FFFD')
+        self._known = {}
+
+    def _render(self, char):
+        mask = self.font.getmask(char)
+        return mask.size, bytes(mask)
+
+    def __contains__(self, codepoint):
+        covered = self._known.get(codepoint)
+        if covered is None:
+            covered = self._render(chr(codepoint)) != self._notdef
+            self._known[codepoint] = covered
+        return covered
+
+
+def _is_neutral(char):
+    """Whitespace and control characters never decide which face renders a run."""
+    return char.isspace() or not char.isprintable()
+
+
+class FontChain:
+    """A primary font plus fallbacks, rendered run by run.
+
+    Exposes getbbox/getlength like a FreeTypeFont. Text fully covered by the primary
+    face takes the plain single-font path and renders exactly as before.
+    """
+
+    def __init__(self, fonts, coverages):
+        self.fonts = fonts
+        self.coverages = coverages
+        self.primary = fonts[0]
+        # Identity used to key rendered text
+        self.path = getattr(self.primary, 'path', None)
+        self.size = getattr(self.primary, 'size', None)
+        self.index = getattr(self.primary, 'index', 0)
+        try:
+            self._ascent = self.primary.getmetrics()[0]
+        except AttributeError:
+            self._ascent = 0
+
+    def _face_for(self, codepoint):
+        for font, coverage in zip(self.fonts, self.coverages):
+            if coverage is None or codepoint in coverage:
+                return font
+        return self.primary
+
+    def runs(self, text):
+        """Split text into (substring, font) runs, each character on the first face covering it.
+
+        Whitespace and control characters stay in the current run.
+        """
+        runs = []
+        current_font = None
+        current = []
+        for char in text:
+            font = current_font if current_font is not None and _is_neutral(char) else self._face_for(ord(char))
+            if font is not current_font and current:
+                runs.append((''.join(current), current_font))
+                current = []
+            current_font = font
+            current.append(char)
+        if current:
+            runs.append((''.join(current), current_font))
+        return runs
+
+    def _single_face(self, runs):
+        return len(runs) <= 1 and (not runs or runs[0][1] is self.primary)
+
+    def getlength(self, text):
+        runs = self.runs(text)
+        if self._single_face(runs):
+            return self.primary.getlength(text)
+        return sum(font.getlength(run) for run, font in runs)
+
+    def getbbox(self, text):
+        runs = self.runs(text)
+        if self._single_face(runs):
+            return self.primary.getbbox(text)
+        left = top = right = bottom = None
+        x = 0
+        for run, font in runs:
+            l, t, r, b = font.getbbox(run, anchor='ls')
+            l, t, r, b = l + x, t + self._ascent, r + x, b + self._ascent
+            left = l if left is None else min(left, l)
+            top = t if top is None else min(top, t)
+            right = r if right is None else max(right, r)
+            bottom = b if bottom is None else max(bottom, b)
+            x += font.getlength(run)
+        return (int(left), int(top), int(right), int(bottom))
+
+    def draw(self, draw, xy, text, fill):
+        """Draw text with its origin (top-left of the primary face's ascender) at xy."""
+        runs = self.runs(text)
+        if self._single_face(runs):
+            draw.text(xy, text, font=self.primary, fill=fill)
+            return
+        x, y = xy
+        for run, font in runs:
+            # Share the primary face's baseline across runs
+            draw.text((x, y + self._ascent), run, font=font, fill=fill, anchor='ls')
+            x += font.getlength(run)
+
+
+def draw_text(draw, xy, text, font, fill):
+    """Draw text with a FontChain or a plain PIL font."""
+    if isinstance(font, FontChain):
+        font.draw(draw, xy, text, fill)
+    else:
+        draw.text(xy, text, font=font, fill=fill)
+
+
+class WordWrapper:
+    """Greedy word wrapping in a single pass over each paragraph's words.
+
+    Every distinct word is measured once (advance width, cached per font) and line
+    widths are accumulated. Only a line whose estimate lands within `margin` of the
+    limit is measured exactly with getbbox, so kerning and side bearings decide the
+    break just as measuring every candidate line would.
+    """
+
+    def __init__(self, font, margin=None):
+        """
+        Initialize the wrapper.
+
+        Args:
+            font: Font (or FontChain) the text is rendered with
+            margin: Width band around the limit verified exactly (default: font size)
+        """
+        self.font = font
+        self.margin = margin if margin is not None else (getattr(font, 'size', None) or 16)
+        self._widths = {}
+        self._space = font.getlength(' ')
+
+    def word_width(self, word):
+        width = self._widths.get(word)
+        if width is None:
+            width = self.font.getlength(word)
+            self._widths[word] = width
+        return width
+
+    def _exact_width(self, words):
+        bbox = self.font.getbbox(' '.join(words))
+        return bbox[2] - bbox[0]
+
+    def wrap(self, words, max_width):
+        """Split a list of words into lines no wider than max_width (long words get their own line)."""
+        lines = []
+        current = []
+        estimate = 0
+        for word in words:
+            width = self.word_width(word)
+            if not current:
+                current, estimate = [word], width
+                continue
+            candidate = estimate + self._space + width
+            if candidate <= max_width - self.margin:
+                fits = True
+            elif candidate > max_width + self.margin:
+                fits = False
+            else:
+                fits = self._exact_width(current + [word]) <= max_width
+            if fits:
+                current.append(word)
+                estimate = candidate
+            else:
+                lines.append(' '.join(current))
+                current, estimate = [word], width
+        if current:
+            lines.append(' '.join(current))
+        return lines
+
+
+class FontManager:
+    """Resolves fonts once per (path, size, weight) and builds fallback chains."""
+
+    def __init__(self, fallback_fonts=None, log_callback=None):
+        """
+        Initialize the manager.
+
+        Args:
+            fallback_fonts: Font files tried, in order, for characters missing from
+                the requested font (e.g. a Noto CJK font)
+            log_callback: Optional callback for warnings about missing fonts
+        """
+        self.fallback_fonts = list(fallback_fonts or [])
+        self.log_callback = log_callback
+        self._lock = threading.Lock()
+        self._resolved = {}  # (path, bold) -> loadable path or None
+        self._fonts = {}  # (path, size) -> FreeTypeFont
+        self._coverages = {}  # path -> CoverageIndex / ProbeCoverage
+        self._chains = {}  # (path, size, bold) -> FontChain
+        self._wrappers = {}  # FontChain -> WordWrapper
+        self._warned = set()
+
+    def _warn(self, message):
+        if message in self._warned:
+            return
+        self._warned.add(message)
+        if self.log_callback:
+            self.log_callback(message)
+        else:
+            print(message)
+
+    def _load(self, path, size):
+        key = (path, size)
+        if key not in self._fonts:
+            try:
+                self._fonts[key] = ImageFont.truetype(path, size)
+            except (OSError, ValueError):
+                self._fonts[key] = None
+        return self._fonts[key]
+
+    def _resolve(self, path, size, bold):
+        """Return the loaded font for path (its bold variant if requested), or None."""
+        key = (path, bold)
+        if key not in self._resolved:
+            candidates = []
+            if bold:
+                candidates = [
+                    path.replace('.ttf', 'b.ttf'),
+                    path.replace('.ttf', 'Bd.ttf'),
+                    path.replace('.ttf', 'Bold.ttf'),
+                    path.replace('.TTF', 'B.TTF'),
+                ]
+            candidates = [c for c in candidates if c != path] + [path]
+            self._resolved[key] = next((c for c in candidates if self._load(c, size) is not None), None)
+        resolved = self._resolved[key]
+        return self._load(resolved, size) if resolved else None
+
+    def _coverage(self, font):
+        path = font.path
+        if path not in self._coverages:
+            try:
+                if not isinstance(path, str) or not os.path.isfile(path):
+                    raise ValueError("font file not on disk")
+                self._coverages[path] = CoverageIndex(_read_cmap_ranges(path, font.index))
+            except (OSError, ValueError, struct.error):
+                # Fonts found through the system font path or unusual containers
+                self._coverages[path] = ProbeCoverage(font)
+        return self._coverages[path]
+
+    def get(self, font_path, size, bold=False):
+        """Return the FontChain for font_path at size, with the fallback fonts behind it."""
+        key = (font_path, size, bold)
+        with self._lock:
+            chain = self._chains.get(key)
+            if chain is not None:
+                return chain
+
+            fonts = []
+            for path in [font_path] + [p for p in self.fallback_fonts if p != font_path]:
+                font = self._resolve(path, size, bold)
+                if font is None:
+                    self._warn(f"Warning: font '{path}' could not be loaded")
+                elif font not in fonts:
+                    fonts.append(font)
+
+            if len(fonts) > 1:
+                coverages = [self._coverage(font) for font in fonts]
+            elif fonts:
+                coverages = [None]
+            else:
+                self._warn("Warning: no usable font, falling back to Pillow's built-in font")
+                try:
+                    fonts = [ImageFont.load_default(size)]
+                except TypeError:
+                    fonts = [ImageFont.load_default()]
+                coverages = [None]
+
+            chain = FontChain(fonts, coverages)
+            self._chains[key] = chain
+            return chain
+
+    def wrapper(self, font):
+        """Return the WordWrapper for a font, keeping its word widths across calls."""
+        with self._lock:
+            wrapper = self._wrappers.get(font)
+            if wrapper is None:
+                wrapper = WordWrapper(font)
+                if isinstance(font, FontChain):
+                    self._wrappers[font] = wrapper
+            return wrapper
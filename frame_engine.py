@@ -0,0 +1,226 @@
+"""
+NumPy frame engine for Music To Visualized Video converter.
+Renders visualizations in Python from a track's stored analysis: the per-frame
+data is computed in vectorised batches and the visualization is drawn onto the
+track background, producing finished rawvideo frames for ffmpeg to encode.
+"""
+
+import math
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from analysis_store import ANALYSIS_RATE, SPECTRUM_SIZE, WAVEFORM_RATE
+from compositor import parse_color
+
+
+def background_array(background):
+    """Return a (height, width, 3) uint8 array for a RawFrame or an image path."""
+    if isinstance(background, (str, Path)):
+        image = Image.open(background).convert('RGB')
+        return np.asarray(image)
+    return np.frombuffer(background.data, dtype=np.uint8).reshape(background.height, background.width, 3)
+
+
+class FrameEngine:
+    """Base class of the Python-rendered visualizations.
+
+    A subclass sets `region` (x, y, width, height), the only part of the frame it
+    draws on, and implements prepare() and draw(). Frames are produced in batches
+    of batch_size so the per-frame data can be computed with whole-array operations.
+    """
+
+    region = (0, 0, 1920, 1080)
+    batch_size = 32
+    needs_spectrum = False
+
+    def __init__(self, frate=30, wavecolor="0xFEFEFE", wavecolor2="0x9400D3"):
+        self.frate = frate
+        self.wavecolor = parse_color(wavecolor)
+        self.wavecolor2 = parse_color(wavecolor2, (148, 0, 211))
+
+    def prepare(self, analysis, frame_count):
+        """Compute track-wide data (envelopes, normalisation) before the first batch.
+
+        analysis is the track's TrackAnalysis at this frame rate.
+        """
+
+    def draw(self, canvas, base, first_frame, count):
+        """Draw frames first_frame .. first_frame + count - 1 onto canvas, yielding after each.
+
+        canvas is the visualization region of the frame; base holds the background
+        pixels of that region, to reset canvas from before drawing a frame.
+        """
+        raise NotImplementedError
+
+    def per_frame(self, array, first_frame, count, fill=0.0):
+        """Rows first_frame .. first_frame + count - 1 of a per-frame analysis array, fill past its end."""
+        rows = np.full((count,) + array.shape[1:], fill, np.float32)
+        available = array[first_frame:first_frame + count]
+        rows[:len(available)] = available
+        return rows
+
+    def frames(self, background, analysis, duration):
+        """Yield every frame of the track as rgb24 bytes, background included."""
+        frame_count = max(1, math.ceil(duration * self.frate))
+        self.prepare(analysis, frame_count)
+
+        frame = background_array(background).copy()
+        x, y, width, height = self.region
+        base = frame[y:y + height, x:x + width].copy()
+        canvas = np.empty_like(base)
+        for first_frame in range(0, frame_count, self.batch_size):
+            count = min(self.batch_size, frame_count - first_frame)
+            for _ in self.draw(canvas, base, first_frame, count):
+                frame[y:y + height, x:x + width] = canvas
+                yield frame.tobytes()
+
+
+class CircularWaveform(FrameEngine):
+    """Vis type 6: left and right channel waveforms bent into two rings that pulse with the
+    track's loudness, the effect circle.glsl needs a GPU for."""
+
+    region = (720, 600, 480, 480)
+    points = 1536        # Points per ring
+    window = 0.035       # Seconds of waveform around the ring
+    subdivisions = 4     # Points drawn between consecutive samples, so the line has no gaps
+    opacity = 0.9
+
+    # (base radius, amplitude) of the outer (left) and inner (right) rings
+    rings = ((170, 55), (75, 40))
+    pulse = 0.12
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        angles = np.arange(self.points) * (2 * np.pi / self.points) - np.pi / 2
+        self._cos = np.cos(angles).astype(np.float32)
+        self._sin = np.sin(angles).astype(np.float32)
+        self._steps = (np.arange(self.subdivisions, dtype=np.float32) / self.subdivisions)
+        # Fractional waveform offsets of the ring points from the start of a frame's window
+        self._offsets = np.arange(self.points) * (self.window * WAVEFORM_RATE / self.points)
+        # 2x2 pen
+        self._pen = np.array([0, 1, self.region[2], self.region[2] + 1])
+        self._samples = None
+        self._envelope = None
+
+    def prepare(self, analysis, frame_count):
+        # Waveform windows centred on each frame start, zeros outside the track
+        half = int(self.window * WAVEFORM_RATE / 2)
+        tail = int(frame_count / self.frate * WAVEFORM_RATE) + 2 * half + 2 - len(analysis.waveform)
+        self._samples = np.concatenate((np.zeros((half, 2), np.float32),
+                                        np.clip(analysis.waveform, -1.0, 1.0).astype(np.float32),
+                                        np.zeros((max(0, tail), 2), np.float32)))
+
+        # Loudness per frame: stored RMS, fast attack and slow release, normalised to
+        # the track's loud passages
+        rms = self.per_frame(analysis.rms, 0, frame_count).mean(axis=1)
+        envelope = np.empty(frame_count, dtype=np.float32)
+        level = 0.0
+        for i, value in enumerate(rms):
+            level = value if value > level else level * 0.85 + value * 0.15
+            envelope[i] = level
+        reference = np.percentile(envelope, 95)
+        self._envelope = np.clip(envelope / reference, 0, 1) if reference > 0 else envelope * 0
+
+    def draw(self, canvas, base, first_frame, count):
+        width, height = self.region[2], self.region[3]
+        frames = np.arange(first_frame, first_frame + count)
+        positions = (frames * (WAVEFORM_RATE / self.frate))[:, None] + self._offsets
+        # Linear interpolation between the stored waveform samples
+        left = positions.astype(np.int64)
+        fraction = (positions - left)[..., None].astype(np.float32)
+        windows = self._samples[left] * (1 - fraction) + self._samples[left + 1] * fraction
+
+        scale = 1 + self.pulse * self._envelope[first_frame:first_frame + count, None]
+        limit = min(width, height) / 2 - 2
+        pixels = []
+        for channel, (radius, amplitude) in enumerate(self.rings):
+            r = np.minimum((radius + amplitude * windows[..., channel]) * scale, limit)
+            pixels.append(self._polyline(width / 2 + r * self._cos, height / 2 + r * self._sin))
+
+        colors = (np.array(self.wavecolor2, np.float32), np.array(self.wavecolor, np.float32))
+        flat = canvas.reshape(-1, 3)
+        for k in range(count):
+            canvas[...] = base
+            for ring_pixels, color in zip(pixels, colors):
+                idx = ring_pixels[k]
+                flat[idx] = flat[idx] * (1 - self.opacity) + color * self.opacity
+            yield k
+
+    def _polyline(self, xs, ys):
+        """Flat pixel indexes of the closed polylines through (xs, ys), one row per frame."""
+        width = self.region[2]
+        next_xs = np.roll(xs, -1, axis=1)
+        next_ys = np.roll(ys, -1, axis=1)
+        line_xs = xs[..., None] + (next_xs - xs)[..., None] * self._steps
+        line_ys = ys[..., None] + (next_ys - ys)[..., None] * self._steps
+        flat = (line_ys.astype(np.int32) * width + line_xs.astype(np.int32)).reshape(len(xs), -1)
+        return flat[..., None] + self._pen
+
+
+class SpectrumBars(FrameEngine):
+    """Vis type 7: log-frequency spectrum bars that rise instantly and fall at a steady rate."""
+
+    region = (660, 700, 600, 340)
+    needs_spectrum = True
+    bars = 48
+    bar_width = 10                 # Pixels, out of the region width / bars per bar slot
+    min_frequency = 40
+    max_frequency = 16000
+    dynamic_range = 60             # dB between an empty and a full bar
+    fall = 0.04                    # Bar height lost per frame, as a fraction of the full height
+    opacity = 0.9
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # FFT bins of each bar: geometric band edges, at least one bin per bar
+        edges = np.geomspace(self.min_frequency, self.max_frequency, self.bars + 1) * SPECTRUM_SIZE / ANALYSIS_RATE
+        self._starts = np.round(edges[:-1]).astype(np.int64)
+        self._ends = np.maximum(np.round(edges[1:]).astype(np.int64), self._starts + 1)
+        width, height = self.region[2], self.region[3]
+        # Bar index of every region column, -1 in the gaps between bars
+        slot = width / self.bars
+        columns = np.arange(width)
+        self._column_bar = np.where(columns % slot < self.bar_width, (columns // slot).astype(np.int64), -1)
+        self._rows = np.arange(height)[:, None]
+        self._levels = None
+        self._blended = None
+
+    def prepare(self, analysis, frame_count):
+        self._blended = None
+        spectrum = self.per_frame(analysis.spectrum, 0, frame_count, fill=-120.0)
+        # Mean dB of every bar's bins for all frames at once, through a running sum over bins
+        running = np.concatenate((np.zeros((frame_count, 1), np.float32), np.cumsum(spectrum, axis=1)), axis=1)
+        bands = (running[:, self._ends] - running[:, self._starts]) / (self._ends - self._starts)
+        ceiling = np.percentile(bands, 99.5)
+        levels = np.clip((bands - (ceiling - self.dynamic_range)) / self.dynamic_range, 0, 1)
+        # Fall-off: each bar is the highest of its recent levels minus `fall` per frame since
+        # that level, i.e. a running maximum of level + fall * t, taken back down by fall * t
+        ramp = (self.fall * np.arange(frame_count, dtype=np.float32))[:, None]
+        self._levels = np.maximum.accumulate(levels + ramp, axis=0) - ramp
+
+    def draw(self, canvas, base, first_frame, count):
+        height = self.region[3]
+        if self._blended is None:
+            # Bars are a vertical gradient from wavecolor (bottom) to wavecolor2 (top)
+            # blended over the constant background, so it is computed once
+            t = np.linspace(1, 0, height, dtype=np.float32)[:, None, None]
+            gradient = np.array(self.wavecolor, np.float32) * (1 - t) + np.array(self.wavecolor2, np.float32) * t
+            self._blended = (base * (1 - self.opacity) + gradient * self.opacity).astype(np.uint8)
+
+        heights = np.round(self._levels[first_frame:first_frame + count] * height).astype(np.int64)
+        # Height of every column, 0 in the gaps
+        column_heights = np.where(self._column_bar >= 0,
+                                  heights[:, np.maximum(self._column_bar, 0)], 0)
+        for k in range(count):
+            mask = self._rows >= height - column_heights[k]
+            np.copyto(canvas, np.where(mask[..., None], self._blended, base))
+            yield k
+
+
+# Vis types rendered by the frame engine instead of an ffmpeg filter graph
+ENGINES = {
+    6: CircularWaveform,
+    7: SpectrumBars,
+}
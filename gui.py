@@ -36,7 +36,10 @@ class ConverterGUI:
         ("Bottom Full-Width", 2),
         ("Top/Bottom", 3),
         ("Vectorscope", 4),
-        ("Circular (GLSL)", 5)
+        ("Circular (GLSL)", 5),
+        ("Circular Waveform (NumPy)", 6),
+        ("Spectrum Bars (NumPy)", 7),
+        ("Waveform Strip (light)", 8)
     ]
     
     def __init__(self, root):
@@ -280,6 +283,11 @@ class ConverterGUI:
         ttk.Entry(settings_frame, textvariable=self.codec_var, width=15, font=('Segoe UI', 9)).grid(row=s_row, column=1, sticky="w", padx=5)
         s_row += 1
 
+        ttk.Label(settings_frame, text="Jobs:", style='Settings.TLabel').grid(row=s_row, column=0, sticky="e", pady=4, padx=(0, 10))
+        self.jobs_var = tk.IntVar(value=1)
+        ttk.Spinbox(settings_frame, from_=1, to=64, width=10, textvariable=self.jobs_var, font=('Segoe UI', 9)).grid(row=s_row, column=1, sticky="w", padx=5)
+        s_row += 1
+
         ttk.Label(settings_frame, text="Shuffle:", style='Settings.TLabel').grid(row=s_row, column=0, sticky="e", pady=4, padx=(0, 10))
         self.shuffle_var = tk.BooleanVar(value=False)
         ttk.Checkbutton(settings_frame, text="🔀 Shuffle tracks", variable=self.shuffle_var, style='Settings.TCheckbutton').grid(row=s_row, column=1, sticky="w", padx=5)
@@ -533,7 +541,8 @@ class ConverterGUI:
                 log_callback=self._log,
                 use_tqdm=False,
                 background=self.background_var.get() if self.background_var.get() else None,
-                sort_type=sort_type
+                sort_type=sort_type,
+                jobs=self.jobs_var.get()
             )
             
             self.converter.process_all()
@@ -0,0 +1,182 @@
+"""
+Job state store for Music To Visualized Video converter.
+Tracks per-track progress in SQLite so restarts, crashes and several converter
+processes sharing one output folder never lose or duplicate work.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+
+PENDING = 'pending'
+RENDERING = 'rendering'
+RENDERED = 'rendered'
+CONCATENATED = 'concatenated'
+
+
+class JobStateStore:
+    """Transactional per-track status store shared by all converters on an output folder."""
+
+    def __init__(self, db_path, heartbeat_interval=60, stale_after=300):
+        """
+        Open (or create) the state database.
+
+        Args:
+            db_path: Path to the SQLite file, normally inside the output folder
+            heartbeat_interval: Seconds between refreshes of this owner's claims
+            stale_after: Seconds without a heartbeat after which another owner's
+                claims are considered abandoned (crashed process) and may be taken over
+        """
+        self.db_path = str(db_path)
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        # Autocommit mode: every write below opens its own explicit transaction
+        self._conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tracks ("
+                " path TEXT PRIMARY KEY,"
+                " status TEXT NOT NULL,"
+                " batch_index INTEGER,"
+                " owner TEXT,"
+                " updated REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS batches ("
+                " batch_index INTEGER PRIMARY KEY,"
+                " owner TEXT,"
+                " created REAL NOT NULL)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+        self._closed = threading.Event()
+        self._heartbeat_thread = threading.Thread(target=self._heartbeat, name="JobStateHeartbeat",
+                                                  daemon=True)
+        self._heartbeat_thread.start()
+
+    def _heartbeat(self):
+        """Keep this owner's claims fresh while the process is alive."""
+        while not self._closed.wait(self.heartbeat_interval):
+            try:
+                with self._transaction() as conn:
+                    conn.execute("UPDATE tracks SET updated = ? WHERE owner = ?", (time.time(), self.owner))
+            except sqlite3.Error:
+                pass
+
+    @contextmanager
+    def _transaction(self):
+        """Serialise access from this process and hold the database write lock."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._conn.execute("COMMIT")
+
+    def import_legacy_json(self, json_path):
+        """Mark files listed in a legacy processed_files.json as concatenated (once).
+
+        Returns the number of imported paths.
+        """
+        if not os.path.exists(json_path):
+            return 0
+        with self._transaction() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_imported'").fetchone():
+                return 0
+            with open(json_path, 'r', encoding='utf-8') as f:
+                paths = json.load(f)
+            now = time.time()
+            conn.executemany(
+                "INSERT OR IGNORE INTO tracks (path, status, batch_index, owner, updated) "
+                "VALUES (?, ?, NULL, NULL, ?)",
+                [(str(path), CONCATENATED, now) for path in paths]
+            )
+            conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_imported', ?)", (str(json_path),))
+        return len(paths)
+
+    def completed_paths(self):
+        """Return the set of paths whose batch video has been written."""
+        with self._lock:
+            rows = self._conn.execute("SELECT path FROM tracks WHERE status = ?", (CONCATENATED,))
+            return {row[0] for row in rows}
+
+    def claim_batch(self, candidates, limit, min_batch_index=0):
+        """Atomically claim up to `limit` candidates and allocate a batch index for them.
+
+        Candidates already concatenated, already claimed by this store, or held by
+        another owner with a fresh heartbeat are skipped. Candidate order is preserved.
+
+        Returns (batch_index, claimed_paths); claimed_paths is empty when nothing is left.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            claimed = []
+            for path in candidates:
+                row = conn.execute("SELECT status, owner, updated FROM tracks WHERE path = ?",
+                                   (str(path),)).fetchone()
+                if row is not None:
+                    status, owner, updated = row
+                    if status == CONCATENATED:
+                        continue
+                    if status in (RENDERING, RENDERED) and \
+                            (owner == self.owner or now - updated < self.stale_after):
+                        continue
+                claimed.append(str(path))
+                if len(claimed) >= limit:
+                    break
+            if not claimed:
+                return None, []
+
+            last_index = conn.execute("SELECT MAX(batch_index) FROM batches").fetchone()[0]
+            batch_index = max(min_batch_index, last_index + 1 if last_index is not None else 0)
+            conn.execute("INSERT INTO batches (batch_index, owner, created) VALUES (?, ?, ?)",
+                         (batch_index, self.owner, now))
+            conn.executemany(
+                "INSERT OR REPLACE INTO tracks (path, status, batch_index, owner, updated) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(path, RENDERING, batch_index, self.owner, now) for path in claimed]
+            )
+        return batch_index, claimed
+
+    def _set_status(self, paths, status, owner):
+        now = time.time()
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO tracks (path, status, batch_index, owner, updated) VALUES (?, ?, NULL, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET status = excluded.status, owner = excluded.owner, "
+                "updated = excluded.updated",
+                [(str(path), status, owner, now) for path in paths]
+            )
+
+    def mark_rendered(self, paths):
+        """Record that the segments for paths are encoded."""
+        self._set_status(paths, RENDERED, self.owner)
+
+    def mark_concatenated(self, paths):
+        """Record that paths are part of a finished batch video."""
+        self._set_status(paths, CONCATENATED, None)
+
+    def release(self, paths):
+        """Return claimed paths to pending so this or another run can retry them."""
+        self._set_status(paths, PENDING, None)
+
+    def close(self):
+        """Stop the heartbeat and close the database connection."""
+        self._closed.set()
+        self._heartbeat_thread.join()
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,126 @@
+"""
+Persistent metadata index for Music To Visualized Video converter.
+Keeps a per-file summary of ID3 tags in SQLite so unchanged files are parsed only once,
+and remembers files that failed to parse so they are not retried until they change.
+"""
+
+import os
+import sqlite3
+import threading
+
+
+class MetadataIndex:
+    """On-disk track metadata index keyed by path and invalidated by file size and mtime."""
+
+    FIELDS = ('title', 'artist', 'album_artist', 'album', 'genre', 'year',
+              'duration', 'has_art', 'has_lyrics')
+
+    def __init__(self, db_path):
+        """
+        Open (or create) the index database.
+
+        Args:
+            db_path: Path to the SQLite file, normally inside the output folder
+        """
+        self.db_path = str(db_path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS tracks ("
+                " path TEXT PRIMARY KEY,"
+                " size INTEGER NOT NULL,"
+                " mtime_ns INTEGER NOT NULL,"
+                " title TEXT, artist TEXT, album_artist TEXT, album TEXT,"
+                " genre TEXT, year TEXT, duration REAL,"
+                " has_art INTEGER, has_lyrics INTEGER)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS failures ("
+                " path TEXT PRIMARY KEY,"
+                " size INTEGER NOT NULL,"
+                " mtime_ns INTEGER NOT NULL,"
+                " error TEXT)"
+            )
+
+    @staticmethod
+    def _stat(path):
+        """Return the (size, mtime_ns) pair used to detect changed files."""
+        st = os.stat(path)
+        return st.st_size, st.st_mtime_ns
+
+    def get(self, path):
+        """Return the indexed record for path, or None if it is missing or stale."""
+        try:
+            size, mtime_ns = self._stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT size, mtime_ns, {', '.join(self.FIELDS)} FROM tracks WHERE path = ?",
+                (str(path),)
+            ).fetchone()
+        if row is None or row[0] != size or row[1] != mtime_ns:
+            return None
+        record = dict(zip(self.FIELDS, row[2:]))
+        record['has_art'] = bool(record['has_art'])
+        record['has_lyrics'] = bool(record['has_lyrics'])
+        return record
+
+    def put_many(self, records):
+        """Store records, a mapping of path -> dict with all FIELDS, in one transaction."""
+        rows = []
+        for path, record in records.items():
+            try:
+                size, mtime_ns = self._stat(path)
+            except OSError:
+                continue
+            rows.append((str(path), size, mtime_ns) + tuple(
+                int(record[field]) if field in ('has_art', 'has_lyrics') else record[field]
+                for field in self.FIELDS
+            ))
+        if not rows:
+            return
+        placeholders = ', '.join('?' * (len(self.FIELDS) + 3))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO tracks (path, size, mtime_ns, {', '.join(self.FIELDS)}) "
+                f"VALUES ({placeholders})",
+                rows
+            )
+            self._conn.executemany("DELETE FROM failures WHERE path = ?", [row[:1] for row in rows])
+
+    def put(self, path, record):
+        """Store a single record."""
+        self.put_many({path: record})
+
+    def get_failure(self, path):
+        """Return the parse error recorded for path, or None if there is none for its current size and mtime."""
+        try:
+            size, mtime_ns = self._stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, error FROM failures WHERE path = ?", (str(path),)
+            ).fetchone()
+        if row is None or row[0] != size or row[1] != mtime_ns:
+            return None
+        return row[2]
+
+    def put_failure(self, path, error):
+        """Record that path could not be parsed, until its size or mtime changes."""
+        try:
+            size, mtime_ns = self._stat(path)
+        except OSError:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO failures (path, size, mtime_ns, error) VALUES (?, ?, ?, ?)",
+                (str(path), size, mtime_ns, str(error))
+            )
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
@@ -5,7 +5,10 @@ CLI entry point for Music To Visualized Video converter.
 
 import argparse
 import subprocess
+import sys
+from pathlib import Path
 from core import MP3ToVideoConverter
+from segment_cache import SegmentCache
 
 
 def check_ffmpeg():
@@ -18,7 +21,30 @@ def check_ffmpeg():
         return False
 
 
+def cache_main(argv):
+    """Report or prune the segment cache of an output folder: mtvv.py cache OUTPUT [--prune MB]."""
+    parser = argparse.ArgumentParser(
+        prog='mtvv.py cache',
+        description='Report or prune the encoded segment cache of an output folder'
+    )
+    parser.add_argument('output_folder', help='Output folder that holds segment_cache')
+    parser.add_argument('--prune', type=float, metavar='MB',
+                        help='Evict least recently used segments until the cache fits in MB (0 clears it)')
+    args = parser.parse_args(argv)
+
+    cache = SegmentCache(Path(args.output_folder) / "segment_cache", 0)
+    count, total = cache.stats()
+    print(f"Segment cache: {count} segments, {total / (1024 * 1024):.1f} MB")
+    if args.prune is not None:
+        removed, removed_bytes = cache.prune(int(args.prune * 1024 * 1024))
+        print(f"Pruned {removed} segments, freed {removed_bytes / (1024 * 1024):.1f} MB")
+
+
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'cache':
+        cache_main(sys.argv[2:])
+        return
+
     parser = argparse.ArgumentParser(
         description='Convert MP3 files to MP4 videos with album art and lyrics'
     )
@@ -34,6 +60,9 @@ def main():
                         help='Audio frequency in Hz for batch chunks (default: 44100)')
     parser.add_argument('--font', default='arial.ttf',
                         help='Font file: default = arial.ttf')
+    parser.add_argument('--fallback-font', action='append', default=[], metavar='FONT',
+                        help='Font file for characters missing from --font, e.g. a Noto CJK font. '
+                             'Repeat to build a fallback chain, tried in order (default: none)')
     parser.add_argument('--shuffle', type=int, default=0,
                         help='Set to 1 to shuffle input list.')
     parser.add_argument('--frate', type=int, default=30,
@@ -46,7 +75,15 @@ def main():
                              '2 for full-width showwaves bottom visualization, '
                              '3 for top/bottom simultaneous visualization, '
                              '4 - avectorscope, '
-                             '5 - circular projection with GLSL shader. (default: 0)')
+                             '5 - circular projection with GLSL shader, '
+                             '6 - pulsing circular waveform drawn by the NumPy frame engine, '
+                             '7 - log-frequency spectrum bars drawn by the NumPy frame engine, '
+                             '8 - whole-track waveform in the background with a moving playhead '
+                             '(cheapest to encode). (default: 0)')
+    parser.add_argument('--vis-rate', type=int,
+                        help='Frame rate the visualization is generated and composited at, each frame held '
+                             'for the output --frate; e.g. 30 or 20 at --frate 60 cuts filter and encode time '
+                             '(default: same as --frate)')
     parser.add_argument('--test', nargs='?', const=60, type=float, default=False,
                         help='Run in test mode - process only 60 seconds of each track (default). '
                              'Optionally specify duration in seconds, e.g. --test 30')
@@ -58,6 +95,28 @@ def main():
                         help='Background image path or hex color (default: blurred album art)')
     parser.add_argument('--sort', choices=['none', 'genre', 'album', 'artist'], default='none',
                         help='Sort tracks by: none (default), genre→album→artist, album→artist, or artist→album')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Number of track segments encoded in parallel within a batch (default: 1)')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='Concatenate each finished batch in the background while the next batch renders '
+                             '(default: off)')
+    parser.add_argument('--render-mode', choices=['segments', 'single'], default='segments',
+                        help='segments: one ffmpeg per track, then concat (default); '
+                             'single: render each batch with one ffmpeg process')
+    parser.add_argument('--audio-mode', choices=['segment', 'batch', 'copy'], default='segment',
+                        help='segment: AAC encoded per track segment (default); '
+                             'batch: encode each batch audio once as one continuous AAC stream; '
+                             'copy: keep the source MP3 audio without transcoding')
+    parser.add_argument('--blur-quality', choices=['fast', 'exact'], default='fast',
+                        help='fast: blur the backdrop at quarter resolution (default, visually identical); '
+                             'exact: blur at full resolution')
+    parser.add_argument('--bg-format', choices=['jpeg', 'png', 'raw'], default='jpeg',
+                        help='How track backgrounds reach ffmpeg: jpeg (q95 temp file, default), '
+                             'png (lossless temp file) or raw (lossless RGB frames piped to ffmpeg, '
+                             'no temp file; single render mode uses png instead)')
+    parser.add_argument('--segment-cache-size', type=int, default=10240,
+                        help='Size cap in MB of the encoded segment cache in the output folder, '
+                             '0 disables it (default: 10240). Use "mtvv.py cache OUTPUT" to inspect or prune it')
     
     args = parser.parse_args()
     
@@ -83,7 +142,16 @@ def main():
         afreq=args.afreq,
         use_tqdm=True,
         background=args.background,
-        sort_type=args.sort
+        sort_type=args.sort,
+        jobs=args.jobs,
+        pipeline=args.pipeline,
+        segment_cache_size=args.segment_cache_size,
+        render_mode=args.render_mode,
+        audio_mode=args.audio_mode,
+        fallback_fonts=args.fallback_font,
+        blur_quality=args.blur_quality,
+        bg_format=args.bg_format,
+        vis_rate=args.vis_rate
     )
     
     try:
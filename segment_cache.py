@@ -0,0 +1,140 @@
+"""
+Content-addressed segment cache for Music To Visualized Video converter.
+Keeps encoded track segments between runs so finished tracks are never re-encoded.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+
+from atomic_file import atomic_path
+
+
+# Bump when the segment command line or filter graph changes in a way the parameters
+# don't capture. 3: still background looped in the graph, visible-strip overlays for
+# vis types 2 and 3, held visualization frames trimmed to the track length.
+CACHE_FORMAT_VERSION = 3
+
+
+class SegmentCache:
+    """Directory of encoded segments named by a hash of everything that affects their content."""
+
+    def __init__(self, cache_dir, max_bytes):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory holding cached segments (created on demand)
+            max_bytes: Size cap; least recently used segments are evicted above it
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._digests = {}
+
+    def file_digest(self, path):
+        """Return the SHA-256 of a file, memoised by path, size and mtime."""
+        st = os.stat(path)
+        memo_key = (str(path), st.st_size, st.st_mtime_ns)
+        with self._lock:
+            digest = self._digests.get(memo_key)
+        if digest is None:
+            sha = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    sha.update(chunk)
+            digest = sha.hexdigest()
+            with self._lock:
+                self._digests[memo_key] = digest
+        return digest
+
+    def make_key(self, audio_path, assets, params):
+        """Build the cache key from the input audio, rendered image assets and encoding params.
+
+        Assets are file paths, in-memory bytes (e.g. raw frames piped to ffmpeg) or None.
+        """
+        sha = hashlib.sha256()
+        sha.update(f"v{CACHE_FORMAT_VERSION}".encode())
+        sha.update(self.file_digest(audio_path).encode())
+        for asset in assets:
+            if isinstance(asset, (bytes, bytearray)):
+                sha.update(hashlib.sha256(asset).hexdigest().encode())
+            else:
+                sha.update(self.file_digest(asset).encode() if asset else b'-')
+        sha.update(json.dumps(params, sort_keys=True, default=str).encode())
+        return sha.hexdigest()
+
+    def _entry(self, key):
+        return self.cache_dir / f"{key}.mp4"
+
+    @staticmethod
+    def _link_or_copy(src, dst):
+        try:
+            if os.path.exists(dst):
+                os.remove(dst)
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
+
+    def fetch(self, key, dest_path):
+        """Place the cached segment for key at dest_path; return False on a cache miss."""
+        entry = self._entry(key)
+        try:
+            os.utime(entry)  # mark as recently used
+            # Another worker's prune can remove the entry at any point; that is a miss too
+            self._link_or_copy(entry, dest_path)
+        except OSError:
+            return False
+        return True
+
+    def store(self, key, segment_path):
+        """Add a freshly encoded segment to the cache and evict old entries over the cap."""
+        if self.max_bytes <= 0 or not os.path.exists(segment_path):
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entry = self._entry(key)
+        with atomic_path(entry) as partial:
+            shutil.copy2(segment_path, partial)
+        self.prune(self.max_bytes)
+
+    def _entries(self):
+        if not self.cache_dir.exists():
+            return []
+        entries = []
+        for entry in self.cache_dir.glob("*.mp4"):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, entry))
+        return entries
+
+    def stats(self):
+        """Return (segment_count, total_bytes)."""
+        entries = self._entries()
+        return len(entries), sum(size for _, size, _ in entries)
+
+    def prune(self, max_bytes=None):
+        """Evict least recently used segments until the cache fits in max_bytes.
+
+        Returns (removed_count, removed_bytes).
+        """
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            removed_count = removed_bytes = 0
+            for _, size, entry in entries:
+                if total <= limit:
+                    break
+                try:
+                    entry.unlink()
+                except OSError:
+                    continue
+                total -= size
+                removed_count += 1
+                removed_bytes += size
+        return removed_count, removed_bytes
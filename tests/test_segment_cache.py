@@ -0,0 +1,38 @@
+import os
+
+import segment_cache
+from segment_cache import SegmentCache
+
+
+def test_fetch_returns_false_when_entry_is_pruned_after_utime(tmp_path, monkeypatch):
+    cache = SegmentCache(tmp_path / "cache", 1 << 30)
+    segment = tmp_path / "segment.mp4"
+    segment.write_bytes(b"segment")
+    key = cache.make_key(segment, [], {})
+    cache.store(key, segment)
+    entry = cache._entry(key)
+    assert entry.exists()
+
+    real_utime = os.utime
+
+    def utime_then_prune(path, *args, **kwargs):
+        # Another worker's store() prunes the entry right after it was marked as used
+        real_utime(path, *args, **kwargs)
+        os.remove(path)
+
+    monkeypatch.setattr(segment_cache.os, "utime", utime_then_prune)
+    dest = tmp_path / "fetched.mp4"
+    assert cache.fetch(key, dest) is False
+    assert not dest.exists()
+
+
+def test_fetch_places_cached_segment(tmp_path):
+    cache = SegmentCache(tmp_path / "cache", 1 << 30)
+    segment = tmp_path / "segment.mp4"
+    segment.write_bytes(b"segment")
+    key = cache.make_key(segment, [], {})
+    cache.store(key, segment)
+
+    dest = tmp_path / "fetched.mp4"
+    assert cache.fetch(key, dest) is True
+    assert dest.read_bytes() == b"segment"
@@ -3,9 +3,31 @@ Visualization filters for Music To Visualized Video converter.
 Contains audio visualization filter generation and video creation with visualizations.
 """
 
+import array
+import math
+import re
+import subprocess
 import sys
+import tempfile
+import threading
 from pathlib import Path
 
+from atomic_file import atomic_path
+from frame_engine import ENGINES
+
+# Bumped whenever the remap tables change, so stale map files are not reused
+REMAP_VERSION = 1
+
+# Scale circle.glsl settles at when the wave is quiet (its per-frame luma zoom is GPU only)
+CIRCLE_REST_SCALE = 1.25
+
+# (x, y, width, height) of the whole-track waveform strip of vis type 8
+WAVEFORM_STRIP = (60, 880, 1800, 160)
+
+_libplacebo_lock = threading.Lock()
+_libplacebo_available = None
+_remap_lock = threading.Lock()
+
 
 def _resolve_shader(name):
     """Resolve shader path: working dir first, then PyInstaller bundle."""
@@ -19,38 +41,230 @@ def _resolve_shader(name):
     return str(local)  # fallback, let ffmpeg handle the error
 
 
+def libplacebo_available():
+    """Return whether ffmpeg can run libplacebo here, probing it once per process.
+
+    libplacebo needs a Vulkan device, so a build that lists the filter can still fail
+    on headless machines; the probe renders one tiny frame through it.
+    """
+    global _libplacebo_available
+    with _libplacebo_lock:
+        if _libplacebo_available is None:
+            try:
+                result = subprocess.run(
+                    ['ffmpeg', '-v', 'error', '-f', 'lavfi', '-i', 'color=s=16x16:d=0.1',
+                     '-vf', 'libplacebo', '-frames:v', '1', '-f', 'null', '-'],
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=60
+                )
+                _libplacebo_available = result.returncode == 0
+            except (OSError, subprocess.TimeoutExpired):
+                _libplacebo_available = False
+        return _libplacebo_available
+
+
+def _filter_path(path):
+    """Escape a file path for use as a filter option value inside a filter graph.
+
+    ffmpeg unescapes the graph twice: once when splitting it into filters (where
+    ' \\ [ ] , ; are special) and once when parsing each filter's options (' \\ :).
+    """
+    value = Path(path).as_posix().replace('\\', '/')
+    value = re.sub(r"([':])", r"\\\1", value)
+    return re.sub(r"([\\'\[\],;])", r"\\\1", value)
+
+
+def _write_pgm(path, width, height, values, maxval):
+    """Atomically write a binary PGM, 16-bit big-endian when maxval exceeds 255."""
+    data = array.array('H' if maxval > 255 else 'B', values)
+    if maxval > 255 and sys.byteorder == 'little':
+        data.byteswap()
+    with atomic_path(path) as partial, open(partial, 'wb') as f:
+        f.write(f"P5\n{width} {height}\n{maxval}\n".encode('ascii'))
+        f.write(data.tobytes())
+
+
+def _polar_tables(width, height, shader):
+    """Compute the source pixel of every output pixel for polar.glsl or circle.glsl.
+
+    Returns (xmap, ymap, edge): nearest-texel coordinates, 65535 where the shader
+    output is fully transparent, and for circle.glsl its soft edge as 0-255 alpha.
+    """
+    xmap, ymap, edge = [], [], []
+    radius = height * 0.5
+    scale = 1.0
+    if shader == 'circle':
+        scale = CIRCLE_REST_SCALE
+        radius = height * 0.5 / scale
+    for y in range(height):
+        for x in range(width):
+            # Fragment centres, as HOOKED_pos * HOOKED_size
+            px = x + 0.5 - width * 0.5
+            py = height * 0.5 - (y + 0.5) if shader == 'polar' else y + 0.5 - height * 0.5
+            dist = math.hypot(px, py)
+            if shader == 'polar':
+                alpha = 1.0 if dist <= radius else 0.0
+            else:
+                # smoothstep(radius, 0.7 * radius, dist)
+                t = min(max((dist - radius) / (0.7 * radius - radius), 0.0), 1.0)
+                alpha = t * t * (3 - 2 * t)
+            if alpha <= 0.0:
+                xmap.append(65535)
+                ymap.append(65535)
+                edge.append(0)
+                continue
+            mapped_x = math.fmod(width / math.pi * (math.pi + math.atan2(py, px)), width) / scale
+            mapped_y = (height - 2.0 * dist) / scale
+            # Clamp-to-edge texture sampling
+            xmap.append(min(max(int(mapped_x), 0), width - 1))
+            ymap.append(min(max(int(mapped_y), 0), height - 1))
+            edge.append(round(255 * alpha))
+    return xmap, ymap, edge
+
+
+def polar_remap_files(shader, width, height, map_dir=None):
+    """Return (xmap, ymap, edge) PGM paths for a shader at one size, computing them once.
+
+    The files are kept in map_dir (default: the system temp folder) and reused by
+    later runs; edge is None for polar.glsl, which has a hard circular mask.
+    """
+    map_dir = Path(map_dir) if map_dir else Path(tempfile.gettempdir()) / "mtvv_remap"
+    stem = f"{shader}_v{REMAP_VERSION}_{width}x{height}"
+    paths = [map_dir / f"{stem}_{name}.pgm" for name in ('x', 'y', 'edge')]
+    if shader == 'polar':
+        paths[2] = None
+    with _remap_lock:
+        if not all(path.exists() for path in paths if path):
+            map_dir.mkdir(parents=True, exist_ok=True)
+            xmap, ymap, edge = _polar_tables(width, height, shader)
+            _write_pgm(paths[0], width, height, xmap, 65535)
+            _write_pgm(paths[1], width, height, ymap, 65535)
+            if paths[2]:
+                _write_pgm(paths[2], width, height, edge, 255)
+    return tuple(paths)
+
+
 class VisualizationFilters:
     """Handles audio visualization filter creation and video segment generation."""
     
-    def __init__(self, vis_type=0, frate=30, afreq=44100, wavecolor="0xFEFEFE", wavecolor2="0x9400D3"):
+    def __init__(self, vis_type=0, frate=30, afreq=44100, wavecolor="0xFEFEFE", wavecolor2="0x9400D3",
+                 polar_backend='auto', map_dir=None, vis_rate=None):
         """
         Initialize visualization filters.
 
         Args:
-            vis_type: Visualization type (0-5)
+            vis_type: Visualization type (0-5, or a frame engine type from frame_engine.ENGINES)
             frate: Video framerate
             afreq: Audio frequency in Hz
             wavecolor: Primary wave color in hex
             wavecolor2: Secondary wave color in hex
+            polar_backend: Projection for types 0 and 5: 'libplacebo' (GLSL shader on the GPU),
+                'remap' (precomputed lookup tables on the CPU) or 'auto' to use libplacebo
+                when ffmpeg can run it
+            map_dir: Folder for the cached remap tables (default: the system temp folder)
+            vis_rate: Frame rate the visualization is generated at (default: frate); below
+                frate each visualization frame is held for several output frames
         """
         self.vis_type = vis_type
         self.frate = frate
+        self.vis_rate = min(vis_rate, frate) if vis_rate else frate
         self.afreq = afreq
         self.wavecolor = wavecolor
         self.wavecolor2 = wavecolor2
+        self.polar_backend = polar_backend
+        self.map_dir = map_dir
+
+    def frame_engine(self):
+        """Return a FrameEngine for this vis type when it is drawn in Python, else None."""
+        engine_class = ENGINES.get(self.vis_type)
+        if engine_class is None:
+            return None
+        return engine_class(frate=self.vis_rate, wavecolor=self.wavecolor, wavecolor2=self.wavecolor2)
+
+    def uses_frame_engine(self):
+        """Whether this vis type is drawn by the NumPy frame engine."""
+        return self.vis_type in ENGINES
 
-    def _create_audio_visualization_filter(self, has_lyrics=False):
+    def uses_polar_projection(self):
+        """Whether this vis type goes through polar.glsl or circle.glsl (types 0 and 5)."""
+        return self.vis_type not in (1, 2, 3, 4, 8) and self.vis_type not in ENGINES
+
+    def resolved_polar_backend(self):
+        """Return 'libplacebo' or 'remap', probing ffmpeg once when the backend is 'auto'."""
+        if self.polar_backend == 'auto':
+            return 'libplacebo' if libplacebo_available() else 'remap'
+        return self.polar_backend
+
+    def _polar_projection(self, shader, p):
+        """Return the filter chain that projects the 480x480 wave through polar or circle.glsl."""
+        if self.resolved_polar_backend() == 'libplacebo':
+            return f"libplacebo=custom_shader_path={_filter_path(_resolve_shader(shader + '.glsl'))}"
+        xmap, ymap, edge = polar_remap_files(shader, 480, 480, self.map_dir)
+        chain = (
+            f"format=rgba[{p}wave];"
+            f"movie={_filter_path(xmap)}[{p}xmap];"
+            f"movie={_filter_path(ymap)}[{p}ymap];"
+            f"[{p}wave][{p}xmap][{p}ymap]remap=fill=black@0"
+        )
+        if edge:
+            # Soft circular edge: multiply the wave's own alpha by the shader's smoothstep
+            chain += (
+                f",split[{p}proj][{p}proj_a];"
+                f"[{p}proj_a]alphaextract[{p}alpha];"
+                f"movie={_filter_path(edge)}[{p}edge];"
+                f"[{p}alpha][{p}edge]blend=all_mode=multiply[{p}soft_alpha];"
+                f"[{p}proj][{p}soft_alpha]alphamerge"
+            )
+        return chain
+
+    def _create_audio_visualization_filter(self, has_lyrics=False, audio_label=None, video_label='0:v',
+                                           label_prefix='', out_label='outv', duration=None):
         """Create and return the audio visualization filter complex and overlay string.
 
         Args:
             has_lyrics: Whether lyrics are being used (affects audio stream index)
+            audio_label: Filter graph label of the audio to visualize (default: the track's input stream)
+            video_label: Label of the background video the visualization is overlaid on
+            label_prefix: Prefix for internal labels, so several tracks can share one filter graph
+            out_label: Label of the composited output video
+            duration: Rendered length of the track in seconds (needed by vis type 8)
 
         Returns a tuple: (filter_complex_part, overlay_expression)
         where filter_complex_part produces [auvis] and overlay_expression is the overlay
-        placement string to be appended in the overall filter_complex.
+        placement string to be appended in the overall filter_complex. Overlays cover
+        only the region the visualization draws on; types that draw in several places
+        produce further layers ([auvis2]) and chain one overlay per layer.
         """
         # Audio stream index depends on whether lyrics are used
         audio_index = 2 if has_lyrics else 1
+        audio_in = f"[{audio_label}]" if audio_label else f"[{audio_index}:a]"
+        video_in = f"[{video_label}]"
+        out = f"[{out_label}]"
+        p = label_prefix
+
+        if self.vis_type in ENGINES:
+            # The frame engine draws the visualization into the background frames it
+            # streams to ffmpeg: nothing to overlay, only the audio label to consume
+            return f"{audio_in}anullsink", f"{video_in}null{out}"
+
+        if self.vis_type == 8:
+            # The whole-track waveform is burned into the background; only a thin playhead
+            # moves. overlay re-evaluates x on every frame (drawbox evaluates its geometry
+            # once), so the playhead is a single looped frame placed from t
+            x, y, width, height = WAVEFORM_STRIP
+            # Bounded to the track so idle tracks of a single-pass graph don't queue frames
+            loops = max(math.ceil(duration * self.vis_rate) - 1, 1) if duration else -1
+            return (
+                f"{audio_in}anullsink",
+                f"color=c={self.wavecolor2}:s=4x{height}:r={self.vis_rate}:d={1 / self.vis_rate},"
+                f"loop=loop={loops}:size=1[{p}playhead];"
+                f"{video_in}[{p}playhead]overlay=x='{x}+{width - 4}*min(t/{duration or 1},1)':y={y}{out}"
+            )
+
+        # Types 0 and 5 project the wave onto a circle; the projection may probe ffmpeg
+        # and write remap tables, so it is only built for those types
+        projection = None
+        if self.uses_polar_projection():
+            projection = self._polar_projection('circle' if self.vis_type == 5 else 'polar', p)
 
         # Dictionary mapping visualization types to their filter configurations
         vis_configs = {
@@ -58,64 +272,66 @@ class VisualizationFilters:
             1: (
                 # Alternative visualization without geq
                 (
-                    f"[{audio_index}:a]aformat=sample_fmts=fltp:sample_rates={self.afreq}:channel_layouts=stereo,"
-                    f"showwaves=mode=cline:draw=full:s=480x480:colors={self.wavecolor2}|{self.wavecolor}:rate={str(self.frate)},"
-                    f"format=rgba[auvis]"
+                    f"{audio_in}aformat=sample_fmts=fltp:sample_rates={self.afreq}:channel_layouts=stereo,"
+                    f"showwaves=mode=cline:draw=full:s=480x480:colors={self.wavecolor2}|{self.wavecolor}:rate={str(self.vis_rate)},"
+                    f"format=rgba[{p}auvis]"
                 ),
-                "[0:v][auvis]overlay=x=720:y=600[outv]"
+                f"{video_in}[{p}auvis]overlay=x=720:y=600{out}"
             ),
             2: (
-                # Full-width bottom visualization (40% height)
+                # Full-width bottom visualization. Only the top 54 source rows land on screen
+                # (a 720x108 wave scaled to 1920x432 at y=864), so crop them and scale
+                # straight to the visible 1920x216 strip.
                 (
-                    f"[{audio_index}:a]aformat=sample_fmts=fltp:sample_rates={self.afreq}:channel_layouts=stereo,"
-                    f"showwaves=mode=cline:draw=full:s=720x108:colors={self.wavecolor2}|{self.wavecolor}:rate={str(self.frate)},"
-                    f"format=rgba,colorchannelmixer=aa=0.85,scale=1920:432:flags=fast_bilinear[auvis]"
+                    f"{audio_in}aformat=sample_fmts=fltp:sample_rates={self.afreq}:channel_layouts=stereo,"
+                    f"showwaves=mode=cline:draw=full:s=720x108:colors={self.wavecolor2}|{self.wavecolor}:rate={str(self.vis_rate)},"
+                    f"crop=720:54:0:0,format=rgba,colorchannelmixer=aa=0.85,"
+                    f"scale=1920:216:flags=fast_bilinear[{p}auvis]"
                 ),
-                "[0:v][auvis]overlay=x=0:y=864[outv]"
+                f"{video_in}[{p}auvis]overlay=x=0:y=864{out}"
             ),
             3: (
-                # Top / bottom simultaneous visualization
+                # Top / bottom simultaneous visualization: the lower half of the wave along
+                # the top edge and the upper half along the bottom edge, each overlaid as
+                # its own 1920x135 strip instead of one mostly transparent full frame.
                 (
-                    f"[{audio_index}:a]aformat=sample_fmts=fltp:sample_rates={self.afreq}:channel_layouts=stereo,"
-                    f"showwaves=mode=cline:draw=full:s=720x108:colors={self.wavecolor}:rate={str(self.frate)},"
-                    f"split[wave1][wave2];"
-                    f"[wave1]crop=720:54:0:54[wave1_cropped];"
-                    f"[wave2]crop=720:54:0:0[wave2_cropped];"
-                    f"[wave1_cropped]pad=720:216:0:0:color=0x00000000[wave1_padded];"
-                    f"[wave2_cropped]pad=720:216:0:162:color=0x00000000[wave2_padded];"
-                    f"[wave1_padded][wave2_padded]vstack[temp_screen];"
-                    f"[temp_screen]format=rgba,colorchannelmixer=aa=0.85,scale=1920:1080:flags=fast_bilinear[auvis]"
+                    f"{audio_in}aformat=sample_fmts=fltp:sample_rates={self.afreq}:channel_layouts=stereo,"
+                    f"showwaves=mode=cline:draw=full:s=720x108:colors={self.wavecolor}:rate={str(self.vis_rate)},"
+                    f"format=rgba,colorchannelmixer=aa=0.85,split[{p}wave1][{p}wave2];"
+                    f"[{p}wave1]crop=720:54:0:54,scale=1920:135:flags=fast_bilinear[{p}auvis];"
+                    f"[{p}wave2]crop=720:54:0:0,scale=1920:135:flags=fast_bilinear[{p}auvis2]"
                 ),
-                "[0:v][auvis]overlay=x=0:y=0[outv]"
+                f"{video_in}[{p}auvis]overlay=x=0:y=0[{p}auvis_top];"
+                f"[{p}auvis_top][{p}auvis2]overlay=x=0:y=945{out}"
             ),
             4: (
                 # Alternative visualization using avectorscope
                 (
-                    f"[{audio_index}:a]aformat=sample_fmts=fltp:sample_rates={self.afreq}:channel_layouts=stereo,"
-                    f"avectorscope=mode=lissajous:swap=1:draw=line:s=720x720:rate={str(self.frate)},"
-                    f"rotate=90*PI/180:oh=ow[auvis]"
+                    f"{audio_in}aformat=sample_fmts=fltp:sample_rates={self.afreq}:channel_layouts=stereo,"
+                    f"avectorscope=mode=lissajous:swap=1:draw=line:s=720x720:rate={str(self.vis_rate)},"
+                    f"rotate=90*PI/180:oh=ow[{p}auvis]"
                 ),
-                "[0:v][auvis]overlay=x=600:y=440[outv]"
+                f"{video_in}[{p}auvis]overlay=x=600:y=440{out}"
             ),
             5: (
                 # Circular projection visualization using GLSL shader
                 (
-                    f"[{audio_index}:a]aformat=sample_fmts=fltp:sample_rates={self.afreq}:channel_layouts=stereo,"
-                    f"showwaves=mode=cline:draw=full:s=480x480:colors={self.wavecolor2}|{self.wavecolor}:split_channels=1:rate={str(self.frate)},"
-                    f"libplacebo=custom_shader_path={_resolve_shader('circle.glsl')}[auvis]"
+                    f"{audio_in}aformat=sample_fmts=fltp:sample_rates={self.afreq}:channel_layouts=stereo,"
+                    f"showwaves=mode=cline:draw=full:s=480x480:colors={self.wavecolor2}|{self.wavecolor}:split_channels=1:rate={str(self.vis_rate)},"
+                    f"{projection}[{p}auvis]"
                 ),
-                "[0:v][auvis]overlay=x=720:y=600[outv]"
+                f"{video_in}[{p}auvis]overlay=x=720:y=600{out}"
             ),
         }
 
-        # Default configuration (vis_type 0) - GPU-accelerated circular projection via libplacebo
+        # Default configuration (vis_type 0) - circular projection via libplacebo, or remap on the CPU
         default_config = (
             (
-                f"[{audio_index}:a]aformat=sample_fmts=fltp:sample_rates={self.afreq}:channel_layouts=stereo,"
-                f"showwaves=mode=cline:draw=full:s=480x480:colors={self.wavecolor2}|{self.wavecolor}:split_channels=1:rate={str(self.frate)},"
-                f"libplacebo=custom_shader_path={_resolve_shader('polar.glsl')}[auvis]"
+                f"{audio_in}aformat=sample_fmts=fltp:sample_rates={self.afreq}:channel_layouts=stereo,"
+                f"showwaves=mode=cline:draw=full:s=480x480:colors={self.wavecolor2}|{self.wavecolor}:split_channels=1:rate={str(self.vis_rate)},"
+                f"{projection}[{p}auvis]"
             ),
-            "[0:v][auvis]overlay=x=720:y=600[outv]"
+            f"{video_in}[{p}auvis]overlay=x=720:y=600{out}"
         )
 
         # Switch-case using dictionary get method